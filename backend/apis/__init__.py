@@ -6,4 +6,6 @@ from backend.apis.suppliers_manager import suppliers
 from backend.apis.user_manager import user
 from backend.apis.order_manager import orders
 from backend.apis.cart_manager import cart
-api = Blueprint.group(products,example,auth,suppliers,user,orders,cart)
+from backend.apis.metrics_manager import metrics
+from backend.apis.events_manager import events
+api = Blueprint.group(products,example,auth,suppliers,user,orders,cart,metrics,events)
@@ -1,22 +1,20 @@
-from backend.databases.mongodb import MongoDB
-from backend.databases.user_collection import UserRepository
 from backend.models.user import User, create_user_schema, login_user_schema
 from backend.utils.jwt import generate_jwt
 from sanic import Blueprint
 from sanic.response import json
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
+from backend.utils.validation import get_validator
 from backend.constants import enum
 auth = Blueprint('auth', url_prefix='/auth')
 
-_db = MongoDB()
-_user_repo = UserRepository(_db)
 
 @auth.post('/register')
 async def register(request):
+    user_repo = request.app.ctx.user_repo
     data = request.json or {}
     # Validate payload (username + password only)
     try:
-        validate(instance=data, schema=create_user_schema)
+        get_validator(create_user_schema).validate(data)
     except ValidationError as e:
         return json({"error": "Payload không hợp lệ", "details": e.message}, status=400)
 
@@ -27,28 +25,34 @@ async def register(request):
         return json({"error": "yêu cầu Username và password"}, status=400)
 
     # Check duplicate
-    if _user_repo.get_user_by_username(username):
+    if await user_repo.get_user_by_username(username):
         return json({"error": "Username đã tồn tại"}, status=409)
     # Create user and insert
     cur_user = User(username=username, password=password,role=enum.User_Role.USER,status=enum.User_Status.ACTIVE) #tạo bằng cái này thì chỉ tạo ra role user
-    _user_repo.insert_user(cur_user.to_dict())
+    # Payload đã validate ở trên; role/status do server đặt theo enum nên không validate lại
+    try:
+        await user_repo.insert_user(cur_user.to_dict(), validated=True)
+    except ValueError:
+        # Hai request đăng ký cùng username: unique index chặn request thứ hai
+        return json({"error": "Username đã tồn tại"}, status=409)
 
     return json({"message": "Đăng ký thành công"}, status=201)
 
 
 @auth.post('/login')
 async def login(request):
+    user_repo = request.app.ctx.user_repo
     data = request.json or {}
     # Basic validation for login
     try:
-        validate(instance=data, schema=login_user_schema)
+        get_validator(login_user_schema).validate(data)
     except ValidationError as e:
         return json({"error": "Payload không hợp lệ", "details": e.message}, status=400)
 
     username = data.get("username", "").strip()
     password = data.get("password", "")
 
-    user = _user_repo.get_user_by_username(username)
+    user = await user_repo.get_user_by_username(username)
     if not user:
         return json({"error": "không tồn tại tài khoản"}, status=401)
 
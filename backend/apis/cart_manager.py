@@ -2,25 +2,18 @@ import logging
 from sanic import Blueprint, json
 from jsonschema import ValidationError
 
-from backend.databases.mongodb import MongoDB
-from backend.databases.cart_collection import CartRepository
-from backend.databases.product_collection import ProductRepository
 from backend.decorators.auth import token_required
 from backend.models.cart import add_to_cart_schema, update_cart_item_schema
 from backend.utils.validation import validate_data
 
-# Initialize database and repositories
-_db = MongoDB()
-cart_repo = CartRepository(_db)
-product_repo = ProductRepository(_db)
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 cart = Blueprint('cart_manager', url_prefix='/cart')
 
 
-def _serialize_cart(cart_data):
-    """Serialize cart data for response"""
+def _cart_view(cart_data):
+    """Cart trả về client, kèm tổng tiền và tổng số lượng"""
     if not cart_data:
         return None
     
@@ -28,17 +21,12 @@ def _serialize_cart(cart_data):
     total_price = round(sum(item.get("price", 0) * item.get("quantity", 0) for item in items), 2)
     total_items = sum(item.get("quantity", 0) for item in items)
     
-    updated_at = cart_data.get("updated_at")
-    # Convert datetime to ISO string if it's a datetime object
-    if updated_at and hasattr(updated_at, 'isoformat'):
-        updated_at = updated_at.isoformat()
-    
     return {
         "username": cart_data.get("username"),
         "items": items,
         "total_price": total_price,
         "total_items": total_items,
-        "updated_at": updated_at
+        "updated_at": cart_data.get("updated_at")
     }
 
 
@@ -49,13 +37,14 @@ def _serialize_cart(cart_data):
 @token_required
 async def bp_get_cart(request):
     """Lấy giỏ hàng của user hiện tại"""
+    cart_repo = request.app.ctx.cart_repo
     try:
         username = request.ctx.user.get("username")
         if not username:
             return json({"error": "Không xác định được người dùng"}, status=400)
         
-        cart_data = cart_repo.get_or_create_cart(username)
-        result = _serialize_cart(cart_data)
+        cart_data = await cart_repo.get_or_create_cart(username)
+        result = _cart_view(cart_data)
         
         return json({
             "success": True,
@@ -82,6 +71,8 @@ async def bp_add_to_cart(request):
     - quantity: Số lượng (mặc định 1)
     - image_url: URL hình ảnh (tùy chọn)
     """
+    product_repo = request.app.ctx.product_repo
+    cart_repo = request.app.ctx.cart_repo
     try:
         username = request.ctx.user.get("username")
         if not username:
@@ -95,7 +86,7 @@ async def bp_add_to_cart(request):
         # Kiểm tra sản phẩm có tồn tại không (tùy chọn, để đảm bảo tính toàn vẹn)
         product_id = item_data.get("product_id")
         # product_id ở frontend đang là code; dùng get_product_by_code
-        product = product_repo.get_product_by_code(product_id)
+        product = await product_repo.get_product_by_code(product_id)
         if not product:
             return json({"error": f"Sản phẩm với ID {product_id} không tồn tại"}, status=404)
         
@@ -105,14 +96,14 @@ async def bp_add_to_cart(request):
             return json({"error": "Sản phẩm đã hết hàng"}, status=400)
         
         # Thêm item vào giỏ
-        success = cart_repo.add_item_to_cart(username, item_data)
+        success = await cart_repo.add_item_to_cart(username, item_data)
         
         if not success:
             return json({"error": "Không thể thêm sản phẩm vào giỏ hàng"}, status=500)
         
         # Lấy giỏ hàng đã cập nhật
-        updated_cart = cart_repo.get_cart_by_username(username)
-        result = _serialize_cart(updated_cart)
+        updated_cart = await cart_repo.get_cart_by_username(username)
+        result = _cart_view(updated_cart)
         
         return json({
             "success": True,
@@ -138,6 +129,7 @@ async def bp_update_cart_item(request, product_id):
     Yêu cầu:
     - quantity: Số lượng mới (nếu = 0 thì xóa item)
     """
+    cart_repo = request.app.ctx.cart_repo
     try:
         username = request.ctx.user.get("username")
         if not username:
@@ -151,14 +143,14 @@ async def bp_update_cart_item(request, product_id):
         new_quantity = update_data.get("quantity", 0)
         
         # Cập nhật số lượng
-        success = cart_repo.update_item_quantity(username, product_id, new_quantity)
+        success = await cart_repo.update_item_quantity(username, product_id, new_quantity)
         
         if not success:
             return json({"error": "Không thể cập nhật giỏ hàng"}, status=400)
         
         # Lấy giỏ hàng đã cập nhật
-        updated_cart = cart_repo.get_cart_by_username(username)
-        result = _serialize_cart(updated_cart)
+        updated_cart = await cart_repo.get_cart_by_username(username)
+        result = _cart_view(updated_cart)
         
         if new_quantity == 0:
             message = "Xóa sản phẩm khỏi giỏ hàng thành công"
@@ -185,20 +177,21 @@ async def bp_update_cart_item(request, product_id):
 @token_required
 async def bp_remove_from_cart(request, product_id):
     """Xóa một sản phẩm khỏi giỏ hàng"""
+    cart_repo = request.app.ctx.cart_repo
     try:
         username = request.ctx.user.get("username")
         if not username:
             return json({"error": "Không xác định được người dùng"}, status=400)
         
         # Xóa item
-        success = cart_repo.remove_item_from_cart(username, product_id)
+        success = await cart_repo.remove_item_from_cart(username, product_id)
         
         if not success:
             return json({"error": "Sản phẩm không tồn tại trong giỏ hàng"}, status=404)
         
         # Lấy giỏ hàng đã cập nhật
-        updated_cart = cart_repo.get_cart_by_username(username)
-        result = _serialize_cart(updated_cart)
+        updated_cart = await cart_repo.get_cart_by_username(username)
+        result = _cart_view(updated_cart)
         
         return json({
             "success": True,
@@ -218,20 +211,21 @@ async def bp_remove_from_cart(request, product_id):
 @token_required
 async def bp_clear_cart(request):
     """Xóa toàn bộ sản phẩm trong giỏ hàng"""
+    cart_repo = request.app.ctx.cart_repo
     try:
         username = request.ctx.user.get("username")
         if not username:
             return json({"error": "Không xác định được người dùng"}, status=400)
         
         # Xóa toàn bộ items
-        success = cart_repo.clear_cart(username)
+        success = await cart_repo.clear_cart(username)
         
         if not success:
             return json({"error": "Không thể xóa giỏ hàng"}, status=500)
         
         # Lấy giỏ hàng đã cập nhật
-        updated_cart = cart_repo.get_cart_by_username(username)
-        result = _serialize_cart(updated_cart)
+        updated_cart = await cart_repo.get_cart_by_username(username)
+        result = _cart_view(updated_cart)
         
         return json({
             "success": True,
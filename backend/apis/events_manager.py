@@ -0,0 +1,43 @@
+from sanic import Blueprint
+
+from config import Config
+from backend.constants.enum import User_Role
+from backend.decorators import token_required, require_role
+from backend.misc.events import event_bus
+
+
+events = Blueprint('events_manager', url_prefix='/events')
+
+TOPICS = ("order", "stock")
+
+
+# ===================================================================
+# SERVER-SENT EVENTS - Admin only
+# ===================================================================
+@events.route('/')
+@token_required
+@require_role(User_Role.ADMIN)
+async def bp_events(request):
+    """Stream SSE các thay đổi đơn hàng / tồn kho - Chỉ Admin.
+
+    Query params:
+    - topics: danh sách topic cách nhau bởi dấu phẩy (order, stock); mặc định tất cả
+
+    Event: order.created, order.updated, order.deleted, stock.changed và resync
+    (client đọc không kịp, đã bị bỏ event: cần tải lại danh sách). Heartbeat mỗi
+    EVENTS_HEARTBEAT_SECONDS giây giữ kết nối qua proxy và response timeout.
+    Mỗi worker có bus riêng, client chỉ nhận event phát ra trong worker của nó.
+    """
+    topics = [t.strip() for t in (request.args.get("topics") or "").split(",") if t.strip()]
+    topics = [t for t in topics if t in TOPICS] or None
+
+    with event_bus.subscribe(topics) as subscription:
+        response = await request.respond(
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Client reconnect (mặc định của EventSource) sau 3 giây nếu mất kết nối
+        await response.send(b"retry: 3000\n\n")
+        while True:
+            # send chờ khi socket đầy, nên client chậm làm đầy queue của chính nó chứ không chặn publisher
+            await response.send(await subscription.get(Config.EVENTS_HEARTBEAT_SECONDS))
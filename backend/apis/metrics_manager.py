@@ -0,0 +1,31 @@
+from sanic import Blueprint, json
+
+from backend.constants.enum import User_Role
+from backend.decorators import token_required, require_role
+from backend.misc.compression import compression_stats
+from backend.misc.events import event_bus
+
+
+metrics = Blueprint('metrics_manager', url_prefix='/metrics')
+
+
+# ===================================================================
+# COMPRESSION METRICS - Admin only
+# ===================================================================
+@metrics.route('/compression')
+@token_required
+@require_role(User_Role.ADMIN)
+async def bp_compression_metrics(request):
+    """Tỉ lệ nén và CPU time của response middleware trong worker hiện tại - Chỉ Admin."""
+    return json(compression_stats.stats(), status=200)
+
+
+# ===================================================================
+# EVENT BUS METRICS - Admin only
+# ===================================================================
+@metrics.route('/events')
+@token_required
+@require_role(User_Role.ADMIN)
+async def bp_event_metrics(request):
+    """Số subscriber SSE, event đã phát và số lần tràn queue trong worker hiện tại - Chỉ Admin."""
+    return json(event_bus.stats(), status=200)
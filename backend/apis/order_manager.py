@@ -1,21 +1,20 @@
+from datetime import date, timedelta
+
 from sanic import Blueprint, json
-from backend.databases.mongodb import MongoDB
-from backend.databases.order_collection import OrderRepository
-from backend.databases.product_collection import ProductRepository
+from config import Config
 from backend.decorators import token_required, require_role
 from backend.constants import enum
 from backend.constants.order_filter import Order_filter
-from backend.hooks.order_hook import _serialize_order, get_order_filter_request
+from backend.databases.sales_collection import GROUP_BY
+from backend.hooks.order_hook import get_order_filter_request
+from backend.utils.export import export_projection, get_export_format, stream_export
 from backend.utils.validation import validate_data
+from backend.views import admin_view, user_view
+from backend.views.admin_view import ORDER_EXPORT_COLUMNS
 from backend.models.order import create_order_schema
 from jsonschema import ValidationError
-from datetime import datetime
-import uuid
 
 
-_db = MongoDB()
-order_repo = OrderRepository(_db)
-product_repo = ProductRepository(_db)
 orders = Blueprint('order_manager', url_prefix='/orders')
 
 # ===================================================================
@@ -25,6 +24,7 @@ orders = Blueprint('order_manager', url_prefix='/orders')
 @token_required
 async def bp_get_orders(request):
     """Lấy danh sách đơn hàng theo filter - Role khác nhau có quyền xem khác nhau."""
+    order_repo = request.app.ctx.order_repo
     # Lấy filter từ request
     filter_obj = get_order_filter_request(request)
     
@@ -36,26 +36,106 @@ async def bp_get_orders(request):
     if user_role == enum.User_Role.USER:
         # Ghi đè customer_id bằng username của user hiện tại
         filter_obj.customer_id = username
-        orders_data = order_repo.get_orders_by_filter(filter_obj.to_dict())
+        try:
+            orders_data, next_cursor = await order_repo.get_orders_by_filter(
+                filter_obj.to_dict(), user_view.ORDER_LIST_PROJECTION
+            )
+        except ValueError as e:
+            return json({"error": str(e)}, status=400)
         
-        serialized_orders = [_serialize_order(order) for order in orders_data]
-        if not serialized_orders:
+        if not orders_data:
             return json({"message": "Không có đơn hàng nào"}, status=200)
-        return json({"orders": serialized_orders, "count": len(serialized_orders)}, status=200)
+        return json({"orders": orders_data, "count": len(orders_data), "next_cursor": next_cursor}, status=200)
     
     # Admin: thấy toàn bộ orders
     elif user_role == enum.User_Role.ADMIN:
-        orders_data = order_repo.get_orders_by_filter(filter_obj.to_dict())
+        try:
+            orders_data, next_cursor = await order_repo.get_orders_by_filter(
+                filter_obj.to_dict(), admin_view.ORDER_LIST_PROJECTION
+            )
+        except ValueError as e:
+            return json({"error": str(e)}, status=400)
         
-        serialized_orders = [_serialize_order(order) for order in orders_data]
-        if not serialized_orders:
+        if not orders_data:
             return json({"message": "Không có đơn hàng nào"}, status=200)
-        return json({"orders": serialized_orders, "count": len(serialized_orders)}, status=200)
+        return json({"orders": orders_data, "count": len(orders_data), "next_cursor": next_cursor}, status=200)
     
     # Guest hoặc role không xác định: không được phép
     return json({"error": "Không có quyền truy cập. Cần đăng nhập."}, status=403)
 
 
+# ===================================================================
+# SALES STATS - Admin only
+# ===================================================================
+@orders.route('/stats')
+@token_required
+@require_role(enum.User_Role.ADMIN)
+async def bp_get_order_stats(request):
+    """Doanh số, số đơn, số lượng bán và lợi nhuận gộp từ rollup theo ngày - Chỉ Admin.
+
+    Query params:
+    - from, to: ngày YYYY-MM-DD (mặc định 30 ngày gần nhất, tính cả hai đầu)
+    - group_by: day | week | month | product | category (mặc định day)
+    """
+    sales_repo = request.app.ctx.sales_repo
+    group_by = request.args.get("group_by") or "day"
+    if group_by not in GROUP_BY:
+        return json({"error": f"group_by phải là một trong: {', '.join(GROUP_BY)}"}, status=400)
+    try:
+        to_day = date.fromisoformat(request.args.get("to") or date.today().isoformat())
+        from_day = date.fromisoformat(request.args.get("from") or (to_day - timedelta(days=29)).isoformat())
+    except ValueError:
+        return json({"error": "from/to phải có dạng YYYY-MM-DD"}, status=400)
+    if from_day > to_day:
+        return json({"error": "from phải nhỏ hơn hoặc bằng to"}, status=400)
+    if (to_day - from_day).days >= Config.SALES_STATS_MAX_DAYS:
+        return json({"error": f"Khoảng thời gian tối đa {Config.SALES_STATS_MAX_DAYS} ngày"}, status=400)
+
+    stats = await sales_repo.get_stats(from_day.isoformat(), to_day.isoformat(), group_by)
+    return json(stats, status=200)
+
+
+# ===================================================================
+# GET ORDER DETAIL - User (đơn của mình) / Admin
+# ===================================================================
+@orders.route('/<order_id>')
+@token_required
+async def bp_get_order(request, order_id):
+    """Chi tiết một đơn hàng, gồm cả danh sách sản phẩm (items).
+
+    User chỉ xem được đơn của chính mình; đơn của người khác trả 404 như đơn không tồn tại.
+    """
+    order_repo = request.app.ctx.order_repo
+    user_role = request.ctx.user.get("role")
+    if user_role not in (enum.User_Role.USER, enum.User_Role.ADMIN):
+        return json({"error": "Không có quyền truy cập. Cần đăng nhập."}, status=403)
+
+    order = await order_repo.get_order_by_id(order_id)
+    if not order or (
+        user_role == enum.User_Role.USER and order.get("user_id") != request.ctx.user.get("username")
+    ):
+        return json({"error": "Đơn hàng không tồn tại"}, status=404)
+    if user_role == enum.User_Role.USER:
+        order = user_view.order_detail_view(order)
+    return json({"order": order}, status=200)
+
+
+# ===================================================================
+# EXPORT ORDERS - Admin only
+# ===================================================================
+@orders.route('/export')
+@token_required
+@require_role(enum.User_Role.ADMIN)
+async def bp_export_orders(request):
+    """Export đơn hàng theo filter dưới dạng NDJSON/CSV (stream) - Chỉ Admin."""
+    order_repo = request.app.ctx.order_repo
+    fmt = get_export_format(request)
+    if fmt is None:
+        return json({"error": "Định dạng export phải là ndjson hoặc csv"}, status=400)
+    filter_dict = get_order_filter_request(request).to_dict()
+    cursor = order_repo.export_cursor(filter_dict, export_projection(ORDER_EXPORT_COLUMNS))
+    await stream_export(request, cursor, fmt, ORDER_EXPORT_COLUMNS, "orders")
+
 # ===================================================================
 # CREATE ORDER - User only
 # ===================================================================
@@ -70,6 +150,8 @@ async def bp_create_order(request):
     - items: Danh sách sản phẩm trong đơn hàng (array, tối thiểu 1 item)
     - payment_method: Phương thức thanh toán (mặc định: cod - tiền mặt)
     """
+    product_repo = request.app.ctx.product_repo
+    order_repo = request.app.ctx.order_repo
     try:
         order_data = request.json or {}
         
@@ -86,14 +168,23 @@ async def bp_create_order(request):
         if not order_data.get("items") or len(order_data.get("items", [])) == 0:
             return json({"error": "Danh sách sản phẩm không được rỗng"}, status=400)
 
-        total_price = 0
         for item in order_data["items"]:
             if item.get("product_id") is None or item.get("name") is None or item.get("price") is None or item.get("quantity") is None:
                 return json({"error": "Mỗi sản phẩm phải có product_id, name, price và quantity"}, status=400)
+
+        # Lấy mọi sản phẩm của đơn trong một truy vấn $in
+        products_by_code = await product_repo.get_products_by_codes(
+            item["product_id"] for item in order_data["items"]
+        )
+
+        total_price = 0
+        for item in order_data["items"]:
             product_id = item["product_id"]
-            product = product_repo.get_product_by_code(product_id)
+            product = products_by_code.get(product_id)
             if not product:
                 return json({"error": f"Sản phẩm với product_id {product_id} không tồn tại"}, status=400)
+            if product.get("status") != enum.Product_Status.ACTIVE:
+                return json({"error": f"Sản phẩm '{product.get('name')}' đã ngừng kinh doanh"}, status=400)
             
             # Kiểm tra số lượng tồn kho
             available_qty = product.get("total_quantity", 0)
@@ -104,43 +195,44 @@ async def bp_create_order(request):
                 }, status=400)
             
             total_price += product.get("sell_price") * item.get("quantity")
+
+            # Chụp giá bán, danh mục và giá nhập tại thời điểm đặt cho rollup doanh số
+            item["price"] = product.get("sell_price")
+            item.pop("category", None)
+            item.pop("import_price", None)
+            if product.get("category") is not None:
+                item["category"] = product["category"]
+            if product.get("import_price") is not None:
+                item["import_price"] = product["import_price"]
         
         order_data["price"] = round(total_price, 2)
 
         # Set default payment_method to cod (cash on delivery) if not provided
         order_data.setdefault("payment_method", "cod")
 
-        # Generate random order_id with prefix if missing
-        order_data.setdefault(
-            "order_id",
-            f"ORD-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
-        )
+        # order_id luôn do server sinh: tăng dần theo thời gian, không trùng giữa các worker
+        order_data["order_id"] = order_repo.new_order_id()
 
         # Validate payload against schema
         validate_data(order_data, create_order_schema)
 
-        # Insert into database
-        inserted_id = order_repo.insert_order(order_data)
-        if not inserted_id:
-            return json({"error": "Không thể tạo đơn hàng"}, status=500)
-
-        # Decrease product quantities after successful order creation
-        for item in order_data.get("items", []):
-            product_id = item.get("product_id")
-            quantity = item.get("quantity", 0)
-            if product_id and quantity > 0:
-                try:
-                    product_repo.decrease_quantity(product_id, quantity)
-                except Exception as e:
-                    # Log error but don't fail the order creation
-                    print(f"Warning: Failed to decrease quantity for product {product_id}: {str(e)}")
-
-        # Fetch created order by order_id
-        created_order = order_repo.get_order_by_id(order_data["order_id"])
+        # Trừ tồn kho (có điều kiện, không bao giờ bán quá số còn), ghi đơn và
+        # làm trống giỏ hàng trong cùng một transaction
+        quantities = {}
+        for item in order_data["items"]:
+            quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+        created_order, short_code = await order_repo.place_order(
+            order_data, quantities, product_repo, request.app.ctx.cart_repo
+        )
+        if not created_order:
+            product = products_by_code.get(short_code, {})
+            return json({
+                "error": f"Sản phẩm '{product.get('name', short_code)}' không còn đủ hàng. Vui lòng điều chỉnh số lượng."
+            }, status=400)
 
         return json({
             "success": "Tạo đơn hàng thành công",
-            "order": _serialize_order(created_order)
+            "order": user_view.order_detail_view(created_order)
         }, status=201)
 
     except ValidationError as e:
@@ -162,6 +254,7 @@ async def bp_update_order_status(request, order_id):
     - order_status: trạng thái đơn hàng (processing, success, cancelled)
     - payment_status: trạng thái thanh toán (pending, completed)
     """
+    order_repo = request.app.ctx.order_repo
     try:
         update_data = request.json or {}
         
@@ -169,7 +262,7 @@ async def bp_update_order_status(request, order_id):
             return json({"error": "Dữ liệu cập nhật không hợp lệ"}, status=400)
         
         # Check if order exists
-        order = order_repo.get_order_by_id(order_id)
+        order = await order_repo.get_order_by_id(order_id)
         if not order:
             return json({"error": "Đơn hàng không tồn tại"}, status=404)
         
@@ -193,17 +286,17 @@ async def bp_update_order_status(request, order_id):
             return json({"error": "Không có trường nào được cập nhật"}, status=400)
         
         # Update order
-        success = order_repo.update_order(order_id, allowed_fields)
+        success = await order_repo.update_order(order_id, allowed_fields)
         
         if not success:
             return json({"error": "Cập nhật không thành công"}, status=400)
         
         # Fetch updated order
-        updated_order = order_repo.get_order_by_id(order_id)
+        updated_order = await order_repo.get_order_by_id(order_id)
         
         return json({
             "success": "Cập nhật đơn hàng thành công",
-            "order": _serialize_order(updated_order)
+            "order": updated_order
         }, status=200)
     
     except Exception as e:
@@ -1,35 +1,31 @@
 from jsonschema import ValidationError
-from sanic import Blueprint, json
+from sanic import Blueprint, empty, json
+
+from config import Config
 
 from backend.constants import enum
-from backend.databases.mongodb import MongoDB
-from backend.databases.product_collection import ProductRepository
-from backend.databases.supplier_collection import SupplierRepository
 from backend.decorators import optional_auth, token_required, require_role
 from backend.hooks.product_hook import (
     get_filter_request,
-    is_product_not_duplicate
+    get_import_format,
+    is_product_not_duplicate,
+    iter_import_rows,
+    resolve_supplier_filter
 )
 from backend.models.product import create_product_schema,filter_product_schema
-from backend.utils.validation import validate_data
+from backend.utils.export import export_projection, get_export_format, stream_export
+from backend.utils.http_cache import cache_headers, compute_etag, is_not_modified
+from backend.utils.validation import get_validation_error, get_validator, validate_data
+from backend.views import admin_view, user_view
 from backend.views.user_view import product_list_view as user_product_view
 from backend.views.admin_view import product_list_view as admin_product_view
 
-# Initialize database and repositories
-_db = MongoDB()
-product_repo = ProductRepository(_db)
-supplier_repo = SupplierRepository(_db)
 
 # Create blueprint
 products = Blueprint('products_manager', url_prefix='/products')
 
-
-# Helper function
-def _serialize_product(product):
-    """Serialize product ObjectId to string."""
-    if product and "_id" in product:
-        product["_id"] = str(product["_id"])
-    return product
+# Validator dựng sẵn cho import hàng loạt
+_create_product_validator = get_validator(create_product_schema)
 
 
 # ===================================================================
@@ -39,6 +35,8 @@ def _serialize_product(product):
 @optional_auth
 async def bp_get_products(request):
     """Lấy danh sách sản phẩm theo filter - Role khác nhau có quyền xem khác nhau."""
+    product_repo = request.app.ctx.product_repo
+    supplier_repo = request.app.ctx.supplier_repo
     # Note: Query parameters are strings, so we skip strict JSON schema validation
     # and just do basic type checks in get_filter_request
     
@@ -46,52 +44,119 @@ async def bp_get_products(request):
     filter_obj = get_filter_request(request)
     
     # Nếu filter theo supplier (id hoặc name) thì đối chiếu và điền đủ thông tin
-    if filter_obj.supplier_id or filter_obj.supplier_name:
-        supplier_doc = None
-        if filter_obj.supplier_id:
-            is_exist, supplier_payload, status = supplier_repo.is_supplier_exist(
-                filter_obj.supplier_id
-            )
-            if not is_exist:
-                return json(supplier_payload, status=status)
-            supplier_doc = supplier_payload
-        elif filter_obj.supplier_name:
-            supplier_doc = supplier_repo.get_supplier_by_name(filter_obj.supplier_name)
-            if not supplier_doc:
-                return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
-
-        filter_obj.supplier_name = supplier_doc.get("name")
-        filter_obj.supplier_id = supplier_doc.get("code")
+    is_valid, error_response = await resolve_supplier_filter(supplier_repo, filter_obj)
+    if not is_valid:
+        return error_response
 
     # Lấy role từ user context
     user_role = request.ctx.user.get("role")
+    filter_dict = filter_obj.to_dict()
     
-    # Guest/User: chỉ thấy sản phẩm active
+    # Guest/User: chỉ thấy sản phẩm active (điều kiện và projection do view khai báo)
     if user_role in [enum.User_Role.GUEST, enum.User_Role.USER]:
-        # Tự động set status = "active" nếu user không chỉ định
-        if not filter_obj.status:
-            filter_obj.status = "active"
-        
         # Lấy products từ database
-        products_data = product_repo.get_products_by_filter(filter_obj.to_dict())
+        try:
+            products_data, next_cursor = await product_repo.get_cached_products_by_filter(
+                filter_dict,
+                user_role,
+                projection=user_view.PRODUCT_LIST_PROJECTION,
+                predicates=user_view.PRODUCT_LIST_PREDICATES,
+            )
+        except ValueError as e:
+            return json({"error": str(e)}, status=400)
+        # Client đã có bản mới nhất: trả 304, không cần serialize
+        etag = compute_etag(user_role, filter_dict, products_data)
+        headers = cache_headers(user_role, etag, products_data)
+        if is_not_modified(request, etag):
+            return empty(status=304, headers=headers)
         result = user_product_view(products_data)
-        if not result:
-            return json({"message": "Không có sản phẩm nào"}, status=200)
-        return json({"products": result, "count": len(result)}, status=200)
+        if not result.get("products"):
+            return json({"message": "Không có sản phẩm nào"}, status=200, headers=headers)
+        result["next_cursor"] = next_cursor
+        return json(result, status=200, headers=headers)
     
     # Admin: thấy toàn bộ
     elif user_role == enum.User_Role.ADMIN:
         # Lấy products từ database
-        products_data = product_repo.get_products_by_filter(filter_obj.to_dict())
+        try:
+            products_data, next_cursor = await product_repo.get_cached_products_by_filter(
+                filter_dict,
+                user_role,
+                projection=admin_view.PRODUCT_LIST_PROJECTION,
+                predicates=admin_view.PRODUCT_LIST_PREDICATES,
+            )
+        except ValueError as e:
+            return json({"error": str(e)}, status=400)
+        etag = compute_etag(user_role, filter_dict, products_data)
+        headers = cache_headers(user_role, etag, products_data)
+        if is_not_modified(request, etag):
+            return empty(status=304, headers=headers)
         result = admin_product_view(products_data)
         if not result.get("products"):
-            return json({"message": "Không có sản phẩm nào", "products": [], "count": 0}, status=200)
-        return json(result, status=200)
+            return json({"message": "Không có sản phẩm nào", "products": [], "count": 0}, status=200, headers=headers)
+        result["next_cursor"] = next_cursor
+        return json(result, status=200, headers=headers)
     
     # Role không xác định
     return json({"error": "Không có quyền truy cập"}, status=403)
 
 
+# ===================================================================
+# PRODUCT FACETS - Số lượng theo category/supplier/khoảng giá
+# ===================================================================
+@products.route('/facets')
+@optional_auth
+async def bp_get_product_facets(request):
+    """Đếm sản phẩm theo category, nhà cung cấp và khoảng giá cho filter hiện tại."""
+    product_repo = request.app.ctx.product_repo
+    supplier_repo = request.app.ctx.supplier_repo
+    filter_obj = get_filter_request(request)
+    # Cùng cách đối chiếu supplier như GET /products để số đếm khớp với danh sách
+    is_valid, error_response = await resolve_supplier_filter(supplier_repo, filter_obj)
+    if not is_valid:
+        return error_response
+    user_role = request.ctx.user.get("role")
+
+    # Guest/User chỉ đếm sản phẩm mà họ được thấy
+    if user_role in [enum.User_Role.GUEST, enum.User_Role.USER]:
+        predicates = user_view.PRODUCT_LIST_PREDICATES
+    elif user_role == enum.User_Role.ADMIN:
+        predicates = admin_view.PRODUCT_LIST_PREDICATES
+    else:
+        return json({"error": "Không có quyền truy cập"}, status=403)
+
+    facets = await product_repo.get_cached_facets(filter_obj.to_dict(), user_role, predicates)
+    return json(facets, status=200)
+
+
+# ===================================================================
+# PRODUCT CACHE STATS - Admin only
+# ===================================================================
+@products.route('/cache/stats')
+@token_required
+@require_role(enum.User_Role.ADMIN)
+async def bp_product_cache_stats(request):
+    """Thống kê hit/miss của catalog cache trong worker hiện tại - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
+    return json(product_repo.catalog_cache.stats(), status=200)
+
+
+# ===================================================================
+# EXPORT PRODUCTS - Admin only
+# ===================================================================
+@products.route('/export')
+@token_required
+@require_role(enum.User_Role.ADMIN)
+async def bp_export_products(request):
+    """Export sản phẩm theo filter dưới dạng NDJSON/CSV (stream) - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
+    fmt = get_export_format(request)
+    if fmt is None:
+        return json({"error": "Định dạng export phải là ndjson hoặc csv"}, status=400)
+    filter_dict = get_filter_request(request).to_dict()
+    cursor = product_repo.export_cursor(filter_dict, export_projection(admin_view.PRODUCT_EXPORT_COLUMNS))
+    await stream_export(request, cursor, fmt, admin_view.PRODUCT_EXPORT_COLUMNS, "products")
+
 # ===================================================================
 # CREATE PRODUCT - Admin only
 # ===================================================================
@@ -100,6 +165,8 @@ async def bp_get_products(request):
 @require_role(enum.User_Role.ADMIN)
 async def bp_create_product(request):
     """Tạo sản phẩm mới - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
+    supplier_repo = request.app.ctx.supplier_repo
     try:
         product_data = request.json
         if not product_data:
@@ -109,14 +176,14 @@ async def bp_create_product(request):
         validate_data(product_data, create_product_schema)
         
         # Kiểm tra supplier tồn tại
-        is_valid, supplier_payload, status = supplier_repo.is_supplier_exist(
+        is_valid, supplier_payload, status = await supplier_repo.is_supplier_exist(
             product_data.get("supplier_id")
         )
         if not is_valid:
             return json(supplier_payload, status=status)
         
         # Kiểm tra product chưa tồn tại
-        is_valid, error_response = is_product_not_duplicate(
+        is_valid, error_response = await is_product_not_duplicate(
             product_repo, 
             product_data.get("code")
         )
@@ -129,12 +196,11 @@ async def bp_create_product(request):
         product_data.setdefault("status", enum.Product_Status.ACTIVE)
         
         # Insert vào database
-        product_id = product_repo.insert_product(product_data)
-        created_product = product_repo.get_product_by_object_id(product_id)
+        created_product = await product_repo.insert_product(product_data, validated=True)
         
         return json({
             "success": "Sản phẩm được thêm vào thành công",
-            "product": _serialize_product(created_product)
+            "product": created_product
         }, status=201)
         
     except ValidationError as e:
@@ -145,6 +211,77 @@ async def bp_create_product(request):
         return json({"error": f"Lỗi server: {str(e)}"}, status=500)
 
 
+# ===================================================================
+# BULK IMPORT PRODUCTS - Admin only
+# ===================================================================
+async def _import_product_batch(product_repo, supplier_repo, batch, known_suppliers, report):
+    """Ghi một batch (số dòng, sản phẩm) đã validate, cập nhật report lỗi theo dòng."""
+    # Đối chiếu các supplier chưa gặp ở batch trước với danh bạ supplier
+    unknown = {row["supplier_id"] for _, row in batch} - known_suppliers
+    if unknown:
+        known_suppliers |= await supplier_repo.get_existing_codes(unknown)
+
+    valid = []
+    for line_number, row in batch:
+        if row["supplier_id"] in known_suppliers:
+            valid.append((line_number, row))
+        else:
+            report["errors"].append({
+                "row": line_number,
+                "error": "id nhà cung cấp không tồn tại, hãy tạo nhà cung cấp trước",
+            })
+
+    inserted, failures = await product_repo.insert_products([row for _, row in valid])
+    report["inserted"] += inserted
+    for index, message in failures:
+        report["errors"].append({"row": valid[index][0], "error": message})
+
+
+@products.route('/import', methods=['POST'], stream=True)
+@token_required
+@require_role(enum.User_Role.ADMIN)
+async def bp_import_products(request):
+    """Import hàng loạt sản phẩm - Chỉ Admin.
+
+    Body là NDJSON (mỗi dòng một sản phẩm) hoặc CSV (dòng đầu là header), được
+    đọc dạng stream và ghi theo batch insert_many(ordered=False). Định dạng lấy
+    từ ?format=ndjson|csv hoặc Content-Type. Trả về số dòng đã thêm và lỗi theo dòng.
+    """
+    product_repo = request.app.ctx.product_repo
+    supplier_repo = request.app.ctx.supplier_repo
+    fmt = get_import_format(request)
+    if not fmt:
+        return json({"error": "Định dạng import phải là ndjson hoặc csv"}, status=400)
+
+    try:
+        report = {"inserted": 0, "errors": []}
+        known_suppliers = set()
+        batch = []
+        async for line_number, row, error in iter_import_rows(request, fmt):
+            if row is not None:
+                row.setdefault("description", "")
+                row.setdefault("total_quantity", 0)
+                row.setdefault("status", enum.Product_Status.ACTIVE)
+                error = get_validation_error(_create_product_validator, row)
+            if error:
+                report["errors"].append({"row": line_number, "error": error})
+                continue
+
+            batch.append((line_number, row))
+            if len(batch) >= Config.BULK_IMPORT_BATCH_SIZE:
+                await _import_product_batch(product_repo, supplier_repo, batch, known_suppliers, report)
+                batch = []
+        if batch:
+            await _import_product_batch(product_repo, supplier_repo, batch, known_suppliers, report)
+
+        report["errors"].sort(key=lambda e: e["row"])
+        report["failed"] = len(report["errors"])
+        return json(report, status=200)
+
+    except Exception as e:
+        return json({"error": f"Lỗi server: {str(e)}"}, status=500)
+
+
 # ===================================================================
 # UPDATE PRODUCT - Admin only
 # ===================================================================
@@ -153,12 +290,8 @@ async def bp_create_product(request):
 @require_role(enum.User_Role.ADMIN)
 async def bp_update_product(request, code):
     """Cập nhật thông tin sản phẩm - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
     try:
-        # Kiểm tra sản phẩm tồn tại
-        current_product = product_repo.get_product_by_code(code)
-        if not current_product:
-            return json({"error": "Sản phẩm không tồn tại trong hệ thống"}, status=400)
-        
         update_data = request.json or {}
         if not update_data:
             return json({"error": "Không có dữ liệu để cập nhật"}, status=400)
@@ -169,13 +302,14 @@ async def bp_update_product(request, code):
         update_data.pop('created_at', None)
         update_data.pop('updated_at', None)
         
-        # Update product
-        product_repo.update_product(code, update_data)
-        updated_product = product_repo.get_product_by_code(code)
+        # Update product: ghi và lấy bản sau cập nhật trong một round trip
+        updated_product = await product_repo.find_and_update_product(code, update_data)
+        if not updated_product:
+            return json({"error": "Sản phẩm không tồn tại trong hệ thống"}, status=400)
         
         return json({
             "success": "Cập nhật sản phẩm thành công",
-            "product": _serialize_product(updated_product)
+            "product": updated_product
         }, status=200)
         
     except ValueError as e:
@@ -192,26 +326,22 @@ async def bp_update_product(request, code):
 @require_role(enum.User_Role.ADMIN)
 async def bp_inactive_product(request, code):
     """Chuyển sản phẩm sang trạng thái inactive - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
     try:
-        # Kiểm tra sản phẩm tồn tại
-        current_product = product_repo.get_product_by_code(code)
-        if not current_product:
+        # Chỉ ghi khi sản phẩm chưa ở trạng thái inactive (điều kiện kiểm tra ngay trong lệnh ghi)
+        updated_product, changed = await product_repo.set_product_status(code, enum.Product_Status.INACTIVE)
+        if not updated_product:
             return json({"error": "Sản phẩm không tồn tại trong hệ thống"}, status=400)
         
-        # Kiểm tra đã inactive chưa
-        if current_product.get("status") == enum.Product_Status.INACTIVE:
+        if not changed:
             return json({
                 "message": "Sản phẩm đã ở trạng thái inactive rồi",
-                "product": _serialize_product(current_product)
+                "product": updated_product
             }, status=200)
         
-        # Cập nhật status
-        product_repo.update_product(code, {"status": enum.Product_Status.INACTIVE})
-        updated_product = product_repo.get_product_by_code(code)
-        
         return json({
             "success": "Sản phẩm đã được chuyển thành inactive",
-            "product": _serialize_product(updated_product)
+            "product": updated_product
         }, status=200)
         
     except ValueError as e:
@@ -228,26 +358,22 @@ async def bp_inactive_product(request, code):
 @require_role(enum.User_Role.ADMIN)
 async def bp_active_product(request, code):
     """Chuyển sản phẩm sang trạng thái active - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
     try:
-        # Kiểm tra sản phẩm tồn tại
-        current_product = product_repo.get_product_by_code(code)
-        if not current_product:
+        # Chỉ ghi khi sản phẩm chưa ở trạng thái active (điều kiện kiểm tra ngay trong lệnh ghi)
+        updated_product, changed = await product_repo.set_product_status(code, enum.Product_Status.ACTIVE)
+        if not updated_product:
             return json({"error": "Sản phẩm không tồn tại trong hệ thống"}, status=400)
         
-        # Kiểm tra đã active chưa
-        if current_product.get("status") == enum.Product_Status.ACTIVE:
+        if not changed:
             return json({
                 "message": "Sản phẩm đã ở trạng thái active rồi",
-                "product": _serialize_product(current_product)
+                "product": updated_product
             }, status=200)
         
-        # Cập nhật status
-        product_repo.update_product(code, {"status": enum.Product_Status.ACTIVE})
-        updated_product = product_repo.get_product_by_code(code)
-        
         return json({
             "success": "Sản phẩm đã được chuyển thành active",
-            "product": _serialize_product(updated_product)
+            "product": updated_product
         }, status=200)
         
     except ValueError as e:
@@ -264,11 +390,12 @@ async def bp_active_product(request, code):
 @require_role(enum.User_Role.ADMIN)
 async def bp_delete_product_by_code(request, code):
     """Xóa sản phẩm - Chỉ xóa được sản phẩm inactive - Chỉ Admin."""
+    product_repo = request.app.ctx.product_repo
     try:
-        deleted_product = product_repo.delete_product(code)
+        deleted_product = await product_repo.delete_product(code)
         return json({
             "success": "Xóa sản phẩm thành công",
-            "product": _serialize_product(deleted_product)
+            "product": deleted_product
         }, status=200)
         
     except ValueError as e:
@@ -1,30 +1,19 @@
-from sanic import Blueprint, json
+from sanic import Blueprint, empty, json
 from jsonschema import ValidationError
 
-from backend.databases.supplier_collection import SupplierRepository
-from backend.databases.mongodb import MongoDB
-from backend.databases.product_collection import ProductRepository
 from backend.decorators.auth import optional_auth, token_required, require_role
 from backend.hooks.supplier_hook import get_filter_request
 from backend.constants.enum import User_Role
 from backend.models.supplier import create_supplier_schema, update_supplier_schema, filter_supplier_schema
+from backend.utils.http_cache import cache_headers, compute_etag, is_not_modified
 from backend.utils.validation import validate_data
+from backend.views import user_view
 from backend.views.user_view import supplier_list_view
 
-_db = MongoDB()
-supplier_repo = SupplierRepository(_db)
-product_repo = ProductRepository(_db)
 
 suppliers = Blueprint('suppliers_manager', url_prefix='/suppliers')
 
 
-def _serialize_supplier(supplier):
-    """Serialize supplier ObjectId to string."""
-    if supplier and "_id" in supplier:
-        supplier["_id"] = str(supplier["_id"])
-    return supplier
-
-
 # ===================================================================
 # GET ALL SUPPLIERS by filter
 # ===================================================================
@@ -36,25 +25,43 @@ async def bp_get_suppliers(request):
     Role GUEST/USER: chỉ trả về thông tin cơ bản.
     Role ADMIN: trả về toàn bộ thông tin.
     """
+    supplier_repo = request.app.ctx.supplier_repo
+    filter_obj = get_filter_request(request)
+    filter_dict = filter_obj.to_dict()
+    # Validate filter đã parse (request.args là list theo từng key, num đã ép kiểu int)
     try:
-        validate_data(request.args, filter_supplier_schema)
+        validate_data({k: v for k, v in filter_dict.items() if v is not None}, filter_supplier_schema)
     except ValidationError:
         return json({"error": "dữ liệu không đúng định dạng schema"}, status=400)
-    filter_obj = get_filter_request(request)
-    suppliers_data = supplier_repo.get_suppliers_by_filter(filter_obj.to_dict())
+    user_role = request.ctx.user.get("role")
+    if user_role in [User_Role.GUEST, User_Role.USER]:
+        projection = user_view.SUPPLIER_LIST_PROJECTION
+        predicates = user_view.SUPPLIER_LIST_PREDICATES
+    else:
+        projection = predicates = None
+    try:
+        suppliers_data, next_cursor = await supplier_repo.get_suppliers_by_filter(
+            filter_dict, projection=projection, predicates=predicates
+        )
+    except ValueError as e:
+        return json({"error": str(e)}, status=400)
 
     if not suppliers_data:
         return json({"message": "không có nhà cung cấp ứng với mô tả"}, status=404)
 
-    user_role = request.ctx.user.get("role")
+    if user_role not in [User_Role.GUEST, User_Role.USER, User_Role.ADMIN]:
+        return json({"error": "Không có quyền truy cập"}, status=403)
+
+    # Client đã có bản mới nhất: trả 304, không cần serialize
+    etag = compute_etag(user_role, filter_dict, suppliers_data)
+    headers = cache_headers(user_role, etag, suppliers_data)
+    if is_not_modified(request, etag):
+        return empty(status=304, headers=headers)
+
     if user_role in [User_Role.GUEST, User_Role.USER]:
         result = supplier_list_view(suppliers_data)
-        return json({"suppliers": result, "count": len(result)}, status=200)
-    elif user_role == User_Role.ADMIN:
-        serialized = [_serialize_supplier(s) for s in suppliers_data]
-        return json({"suppliers": serialized, "count": len(serialized)}, status=200)
-    else:
-        return json({"error": "Không có quyền truy cập"}, status=403)
+        return json({"suppliers": result, "count": len(result), "next_cursor": next_cursor}, status=200, headers=headers)
+    return json({"suppliers": suppliers_data, "count": len(suppliers_data), "next_cursor": next_cursor}, status=200, headers=headers)
 
 
 # ===================================================================
@@ -65,6 +72,7 @@ async def bp_get_suppliers(request):
 @require_role(User_Role.ADMIN)
 async def bp_create_supplier(request):
     """Thêm nhà cung cấp mới - Chỉ Admin."""
+    supplier_repo = request.app.ctx.supplier_repo
     try:
         supplier_data = request.json
         if not supplier_data:
@@ -73,12 +81,11 @@ async def bp_create_supplier(request):
         validate_data(supplier_data, create_supplier_schema)
         supplier_data.setdefault("status", "active")
 
-        supplier_id = supplier_repo.insert_supplier(supplier_data)
-        created_supplier = supplier_repo.get_supplier_by_object_id(supplier_id)
+        created_supplier = await supplier_repo.insert_supplier(supplier_data, validated=True)
 
         return json({
             "success": "nhà cung cấp được thêm thành công",
-            "data": _serialize_supplier(created_supplier)
+            "data": created_supplier
         }, status=201)
 
     except ValidationError:
@@ -97,27 +104,24 @@ async def bp_create_supplier(request):
 @require_role(User_Role.ADMIN)
 async def bp_update_supplier(request, supplier_id):
     """Cập nhật thông tin nhà cung cấp - Chỉ Admin."""
+    supplier_repo = request.app.ctx.supplier_repo
     try:
-        supplier = supplier_repo.get_supplier_by_object_id(supplier_id)
-        if not supplier:
-            return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
-
         update_data = request.json
         if not update_data:
             return json({"error": "Dữ liệu cập nhật không hợp lệ"}, status=400)
 
         validate_data(update_data, update_supplier_schema)
 
-        supplier_code = supplier.get("code")
-        success = supplier_repo.update_supplier(supplier_code, update_data)
-
-        if not success:
-            return json({"error": "Cập nhật không thành công"}, status=400)
+        # Ghi và lấy bản sau cập nhật trong một round trip
+        updated_supplier = await supplier_repo.find_and_update_supplier(
+            supplier_id, update_data, validated=True
+        )
+        if not updated_supplier:
+            return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
 
-        updated_supplier = supplier_repo.get_supplier_by_code(supplier_code)
         return json({
             "success": "Cập nhật thành công",
-            "data": _serialize_supplier(updated_supplier)
+            "data": updated_supplier
         }, status=200)
 
     except ValidationError:
@@ -139,24 +143,26 @@ async def bp_delete_supplier(request, supplier_id):
 
     Ràng buộc: Nhà cung cấp phải inactive & không còn sản phẩm liên kết.
     """
+    product_repo = request.app.ctx.product_repo
+    supplier_repo = request.app.ctx.supplier_repo
     try:
-        supplier = supplier_repo.get_supplier_by_object_id(supplier_id)
+        supplier = await supplier_repo.get_supplier_by_object_id(supplier_id)
         if not supplier:
             return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
 
         supplier_code = supplier.get("code")
 
-        products = product_repo.get_products_by_supplier(supplier_code)
+        products = await product_repo.get_products_by_supplier(supplier_code)
         if products:
             return json({
                 "error": "Không thể xóa nhà cung cấp đang có sản phẩm liên kết"
             }, status=400)
 
-        supplier_repo.delete_supplier(supplier_code)
+        await supplier_repo.delete_supplier(supplier_code)
 
         return json({
             "success": "Xóa nhà cung cấp thành công",
-            "data": _serialize_supplier(supplier)
+            "data": supplier
         }, status=200)
 
     except ValueError as e:
@@ -173,25 +179,22 @@ async def bp_delete_supplier(request, supplier_id):
 @require_role(User_Role.ADMIN)
 async def bp_inactive_supplier(request, supplier_id):
     """Chuyển nhà cung cấp sang trạng thái inactive - Chỉ Admin."""
+    supplier_repo = request.app.ctx.supplier_repo
     try:
-        supplier = supplier_repo.get_supplier_by_object_id(supplier_id)
-        if not supplier:
+        # Chỉ ghi khi nhà cung cấp chưa ở trạng thái inactive (điều kiện kiểm tra ngay trong lệnh ghi)
+        updated_supplier, changed = await supplier_repo.set_supplier_status(supplier_id, "inactive")
+        if not updated_supplier:
             return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
 
-        supplier_code = supplier.get("code")
-
-        if supplier.get("status") == "inactive":
+        if not changed:
             return json({
                 "message": "Nhà cung cấp đã ở sẵn trạng thái inactive",
-                "data": _serialize_supplier(supplier)
+                "data": updated_supplier
             }, status=200)
 
-        supplier_repo.update_supplier(supplier_code, {"status": "inactive"})
-        updated_supplier = supplier_repo.get_supplier_by_code(supplier_code)
-
         return json({
             "success": "inactive thành công",
-            "data": _serialize_supplier(updated_supplier)
+            "data": updated_supplier
         }, status=200)
 
     except ValueError as e:
@@ -208,25 +211,22 @@ async def bp_inactive_supplier(request, supplier_id):
 @require_role(User_Role.ADMIN)
 async def bp_active_supplier(request, supplier_id):
     """Kích hoạt lại nhà cung cấp sang trạng thái active - Chỉ Admin."""
+    supplier_repo = request.app.ctx.supplier_repo
     try:
-        supplier = supplier_repo.get_supplier_by_object_id(supplier_id)
-        if not supplier:
+        # Chỉ ghi khi nhà cung cấp chưa ở trạng thái active (điều kiện kiểm tra ngay trong lệnh ghi)
+        updated_supplier, changed = await supplier_repo.set_supplier_status(supplier_id, "active")
+        if not updated_supplier:
             return json({"error": "Nhà cung cấp không tồn tại"}, status=400)
 
-        supplier_code = supplier.get("code")
-
-        if supplier.get("status") == "active":
+        if not changed:
             return json({
                 "message": "Nhà cung cấp đã ở sẵn trạng thái active",
-                "data": _serialize_supplier(supplier)
+                "data": updated_supplier
             }, status=200)
 
-        supplier_repo.update_supplier(supplier_code, {"status": "active"})
-        updated_supplier = supplier_repo.get_supplier_by_code(supplier_code)
-
         return json({
             "success": "active thành công",
-            "data": _serialize_supplier(updated_supplier)
+            "data": updated_supplier
         }, status=200)
 
     except ValueError as e:
@@ -1,15 +1,12 @@
 from sanic import Blueprint, json
 from backend.constants.enum import User_Role
-from backend.databases.mongodb import MongoDB
-from backend.databases.user_collection import UserRepository
 from backend.decorators.auth import token_required,require_role
 from backend.hooks.user_hook import get_filter_request
-from backend.views.admin_view import user_list_view
+from backend.utils.export import export_projection, get_export_format, stream_export
+from backend.views.admin_view import USER_EXPORT_COLUMNS, USER_LIST_PROJECTION, user_list_view
 
 
 user = Blueprint('users', url_prefix='/users')
-_db = MongoDB()
-user_repo = UserRepository(_db)
 # ===================================================================
 # GET ALL Users by filter
 # ===================================================================
@@ -18,8 +15,31 @@ user_repo = UserRepository(_db)
 @token_required
 @require_role([User_Role.ADMIN])
 async def bp_get_users(request):
+    user_repo = request.app.ctx.user_repo
     filter_object = get_filter_request(request)
-    users_data = user_repo.get_user_by_filter(filter_object.to_dict())
+    try:
+        users_data, next_cursor = await user_repo.get_user_by_filter(
+            filter_object.to_dict(), projection=USER_LIST_PROJECTION
+        )
+    except ValueError as e:
+        return json({"error": str(e)}, status=400)
     result = user_list_view(users_data)
+    result["next_cursor"] = next_cursor
     return json(result, status=200)
 
+
+# ===================================================================
+# EXPORT USERS - Admin only
+# ===================================================================
+@user.route('/export')
+@token_required
+@require_role(User_Role.ADMIN)
+async def bp_export_users(request):
+    """Export người dùng theo filter dưới dạng NDJSON/CSV (stream) - Chỉ Admin."""
+    user_repo = request.app.ctx.user_repo
+    fmt = get_export_format(request)
+    if fmt is None:
+        return json({"error": "Định dạng export phải là ndjson hoặc csv"}, status=400)
+    filter_dict = get_filter_request(request).to_dict()
+    cursor = user_repo.export_cursor(filter_dict, export_projection(USER_EXPORT_COLUMNS))
+    await stream_export(request, cursor, fmt, USER_EXPORT_COLUMNS, "users")
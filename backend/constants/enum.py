@@ -18,4 +18,5 @@ class Payment_Status:
     SUCCESS = "success"
 class Order_Status:
     PROCESSING = "processing"
-    SUCCESS = "success"
\ No newline at end of file
+    SUCCESS = "success"
+    CANCELLED = "cancelled"
\ No newline at end of file
@@ -3,4 +3,6 @@ class MongoCollections:
     supplier = 'supplier'
     product = 'product'
     batch = 'batch'
-    order = 'order'
\ No newline at end of file
+    order = 'order'
+    sales_daily = 'sales_daily'
+    order_archive = 'order_archive'
\ No newline at end of file
@@ -15,7 +15,7 @@ class Order_filter:
         order_status: str = Order_Status.PROCESSING,
         note: str = "",
         created_at: Optional[datetime] = None,
-        start: int = None,
+        after: str = None,
         num: int = None,
     ):
         self.order_id = order_id
@@ -27,9 +27,8 @@ class Order_filter:
         self.order_status = order_status
         self.note = note
         self.created_at = created_at
-        if start == -1: start = None
         if num == -1: num = None
-        self.start = start
+        self.after = after
         self.num = num
     def to_dict(self) -> dict:
         return {
@@ -42,6 +41,6 @@ class Order_filter:
             "order_status": self.order_status,
             "note": self.note,
             "created_at": self.created_at,
-            "start": self.start,
+            "after": self.after,
             "num": self.num,
         }
\ No newline at end of file
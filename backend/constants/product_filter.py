@@ -10,7 +10,13 @@ class Product_filter:
         product_code: str = None,
         supplier_name: str = None,
         product_name: str = None,
-        start: int = None, num: int = None,
+        q: str = None,
+        min_price: float = None,
+        max_price: float = None,
+        min_quantity: int = None,
+        max_quantity: int = None,
+        sort: str = None,
+        after: str = None, num: int = None,
         
     ):
         self.category = category
@@ -19,9 +25,14 @@ class Product_filter:
         self.product_code = product_code
         self.supplier_name = supplier_name
         self.product_name = product_name
-        if start == -1: start = None
+        self.q = q
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_quantity = min_quantity
+        self.max_quantity = max_quantity
+        self.sort = sort
         if num == -1: num = None
-        self.start = start
+        self.after = after
         self.num = num
     def to_dict(self) -> Dict:
         return {
@@ -31,7 +42,13 @@ class Product_filter:
             "code": self.product_code,  # Map to 'code' field in DB
             "supplier_name": self.supplier_name,
             "name": self.product_name,  # Map to 'name' field in DB
-            "start": self.start,
+            "q": self.q,  # Tìm kiếm không dấu trên name/category/description
+            "min_price": self.min_price,  # Khoảng trên sell_price
+            "max_price": self.max_price,
+            "min_quantity": self.min_quantity,  # Khoảng trên total_quantity
+            "max_quantity": self.max_quantity,
+            "sort": self.sort,  # price | -price | newest | name
+            "after": self.after,
             "num": self.num,
         }
 
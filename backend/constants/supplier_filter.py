@@ -9,7 +9,7 @@ class Supplier_filter:
             phone: str = None,
             email: str = None,
             status: str = Supplier_Status.ACTIVE,
-            start: int = None, num: int = None,
+            after: str = None, num: int = None,
     ):
         self.code = code
         self.name = name
@@ -17,9 +17,8 @@ class Supplier_filter:
         self.phone = phone
         self.email = email
         self.status = status
-        if start == -1: start = None
         if num == -1: num = None
-        self.start = start
+        self.after = after
         self.num = num
     
     def to_dict(self) -> Dict:
@@ -30,7 +29,7 @@ class Supplier_filter:
             "phone": self.phone,
             "email": self.email,
             "status": self.status,
-            "start": self.start,
+            "after": self.after,
             "num": self.num,
         }
     
\ No newline at end of file
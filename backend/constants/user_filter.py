@@ -7,20 +7,22 @@ class User_filter:
             username: str = None,
             email: str = None,
             status: str = None,
-            start: int = None, num: int = None,
+            role: str = None,
+            after: str = None, num: int = None,
     ):
         self.username = username
         self.email = email
         self.status = status
-        if start == -1: start = None
+        self.role = role
         if num == -1: num = None
-        self.start = start
+        self.after = after
         self.num = num
     def to_dict(self) -> Dict:
         return{
             "username": self.username,
             "email": self.email,
             "status": self.status,
-            "start": self.start,
+            "role": self.role,
+            "after": self.after,
             "num": self.num,
         }
\ No newline at end of file
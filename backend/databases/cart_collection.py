@@ -14,13 +14,15 @@ class CartRepository:
         self.db = db
         # MongoDB wrapper exposes client and db; use db.db to get database handle
         self.collection = db.db["carts"]
-        # Tạo index để tìm cart nhanh hơn
-        self.collection.create_index("username", unique=True)
+
+    async def _ensure_indexes(self) -> None:
+        """Tạo index để tìm cart nhanh hơn"""
+        await self.collection.create_index("username", unique=True)
     
     # ===================================================================
     # CREATE / INSERT
     # ===================================================================
-    def create_cart(self, username: str) -> str:
+    async def create_cart(self, username: str) -> str:
         """Tạo giỏ hàng mới cho user"""
         cart_data = {
             "username": username,
@@ -28,30 +30,30 @@ class CartRepository:
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         }
-        result = self.collection.insert_one(cart_data)
+        result = await self.collection.insert_one(cart_data)
         return str(result.inserted_id)
     
     # ===================================================================
     # READ / GET
     # ===================================================================
-    def get_cart_by_username(self, username: str) -> Optional[Dict]:
+    async def get_cart_by_username(self, username: str) -> Optional[Dict]:
         """Lấy giỏ hàng của user theo username"""
-        return self.collection.find_one({"username": username})
+        return await self.collection.find_one({"username": username})
     
-    def get_or_create_cart(self, username: str) -> Dict:
+    async def get_or_create_cart(self, username: str) -> Dict:
         """Lấy giỏ hàng, nếu không có thì tạo mới"""
-        cart = self.get_cart_by_username(username)
+        cart = await self.get_cart_by_username(username)
         if not cart:
-            self.create_cart(username)
-            cart = self.get_cart_by_username(username)
+            await self.create_cart(username)
+            cart = await self.get_cart_by_username(username)
         return cart
     
     # ===================================================================
     # UPDATE
     # ===================================================================
-    def add_item_to_cart(self, username: str, item: Dict) -> bool:
+    async def add_item_to_cart(self, username: str, item: Dict) -> bool:
         """Thêm item vào giỏ hàng hoặc tăng số lượng nếu đã có"""
-        cart = self.get_or_create_cart(username)
+        cart = await self.get_or_create_cart(username)
         
         # Kiểm tra xem product đã có trong giỏ không
         product_id = item.get("product_id")
@@ -73,7 +75,7 @@ class CartRepository:
             new_items.append(item)
         
         # Cập nhật giỏ hàng
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"username": username},
             {
                 "$set": {
@@ -84,9 +86,9 @@ class CartRepository:
         )
         return result.modified_count > 0 or result.matched_count > 0
     
-    def update_item_quantity(self, username: str, product_id: str, quantity: int) -> bool:
+    async def update_item_quantity(self, username: str, product_id: str, quantity: int) -> bool:
         """Cập nhật số lượng item trong giỏ"""
-        cart = self.get_cart_by_username(username)
+        cart = await self.get_cart_by_username(username)
         if not cart:
             return False
         
@@ -101,7 +103,7 @@ class CartRepository:
                     item["quantity"] = quantity
                 break
         
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"username": username},
             {
                 "$set": {
@@ -112,25 +114,26 @@ class CartRepository:
         )
         return result.modified_count > 0
     
-    def clear_cart(self, username: str) -> bool:
-        """Xóa toàn bộ items trong giỏ hàng"""
-        result = self.collection.update_one(
+    async def clear_cart(self, username: str, session=None) -> bool:
+        """Xóa toàn bộ items trong giỏ hàng (session: khi chạy trong transaction)"""
+        result = await self.collection.update_one(
             {"username": username},
             {
                 "$set": {
                     "items": [],
                     "updated_at": datetime.utcnow()
                 }
-            }
+            },
+            session=session,
         )
         return result.modified_count > 0
     
     # ===================================================================
     # DELETE
     # ===================================================================
-    def remove_item_from_cart(self, username: str, product_id: str) -> bool:
+    async def remove_item_from_cart(self, username: str, product_id: str) -> bool:
         """Xóa một item khỏi giỏ hàng"""
-        cart = self.get_cart_by_username(username)
+        cart = await self.get_cart_by_username(username)
         if not cart:
             return False
         
@@ -143,7 +146,7 @@ class CartRepository:
             # Không tìm thấy item
             return False
         
-        result = self.collection.update_one(
+        result = await self.collection.update_one(
             {"username": username},
             {
                 "$set": {
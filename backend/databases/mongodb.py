@@ -1,13 +1,25 @@
 from backend.constants.mongodb_constants import MongoCollections
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from config import Config
 
 class MongoDB:
     def __init__(self, connection_url=None):
         if connection_url is None:
             connection_url = Config.MONGO_URI
-        self.client = MongoClient(connection_url, serverSelectionTimeoutMS=3000)
+        # AsyncMongoClient chỉ mở kết nối ở lần truy vấn đầu tiên, trên event loop của worker
+        self.client = AsyncMongoClient(
+            connection_url,
+            serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            compressors=Config.MONGO_COMPRESSORS or None,
+        )
         self.db = self.client[Config.MONGO_DB_NAME]
 
     def get_collection(self, name):
         return self.db[name]
+
+    async def close(self):
+        """Đóng pool kết nối và các monitor thread của client."""
+        await self.client.close()
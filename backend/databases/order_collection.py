@@ -1,65 +1,352 @@
-from datetime import datetime
-from typing import Dict
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, DeleteOne, ReplaceOne, ReturnDocument
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from config import Config
 from backend.constants.mongodb_constants import MongoCollections
 from backend.databases.mongodb import MongoDB
-from backend.utils.validation import validate_data
-from backend.models.order import create_order_schema
+from backend.misc.events import event_bus
+from backend.constants.enum import Order_Status
+from backend.utils.pagination import encode_cursor, find_page
+from backend.utils.snowflake import SnowflakeGenerator, current_worker_id, snowflake_floor
+
+class _OutOfStock(Exception):
+    """Dùng để abort transaction đặt hàng khi một dòng không đủ hàng."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+def _order_summary(order: Dict) -> Dict:
+    """Bản tóm tắt của đơn trong event order.* (cùng các trường với danh sách đơn của admin)."""
+    return {
+        "order_id": order.get("order_id"),
+        "user_id": order.get("user_id"),
+        "order_status": order.get("order_status"),
+        "payment_status": order.get("payment_status"),
+        "payment_method": order.get("payment_method"),
+        "price": order.get("price"),
+        "total_amount": order.get("total_amount"),
+        "shipping_address": order.get("shipping_address"),
+        "note": order.get("note"),
+        "created_at": order.get("created_at"),
+        "item_count": len(order.get("items") or []),
+    }
+
 
 class OrderRepository:
-    def __init__(self, db:MongoDB):
+    # Đơn ở trạng thái này không còn thay đổi thường xuyên, được archiver chuyển sang order_archive
+    TERMINAL_STATUSES = (Order_Status.SUCCESS, Order_Status.CANCELLED)
+
+    def __init__(self, db:MongoDB, sales_repo=None):
+        self.client = db.client
         self.order = db.get_collection(MongoCollections.order)
-        self._ensure_indexes()
-    def _ensure_indexes(self) -> None:
-        """Create product indexes."""
+        # Đơn success/cancelled cũ (archive_orders); chỉ đọc khi truy vấn chạm tới dữ liệu cũ
+        self.archive = db.get_collection(MongoCollections.order_archive)
+        # order_id lớn nhất trong archive lúc khởi động/sau mỗi lần archive của worker này
+        self._archive_high_water = ""
+        # SalesRollupRepository: rollup doanh số theo ngày, cập nhật sau mỗi lần ghi đơn
+        self.sales_repo = sales_repo
+        self.id_generator = SnowflakeGenerator(current_worker_id())
+        # None: chưa kiểm tra; transaction chỉ có trên replica set / sharded cluster
+        self._transactions_supported: Optional[bool] = None
+    async def _ensure_indexes(self) -> None:
+        """Create order indexes."""
         try:
-            self.order.create_index("order_id", unique=True)
+            # order_id tăng dần theo thời gian (new_order_id): vừa unique vừa là khóa keyset
+            await self.order.create_index("order_id", unique=True)
+            # Lịch sử đơn của một user / danh sách đơn theo trạng thái, mới nhất trước:
+            # equality + sort đều nằm trong index nên mỗi trang chỉ quét đúng `num` key
+            await self.order.create_index([("user_id", ASCENDING), ("order_id", DESCENDING)])
+            await self.order.create_index([("order_status", ASCENDING), ("order_id", DESCENDING)])
+            # Archive được truy vấn với cùng filter/sort nên cần cùng bộ index
+            await self.archive.create_index("order_id", unique=True)
+            await self.archive.create_index([("user_id", ASCENDING), ("order_id", DESCENDING)])
+            await self.archive.create_index([("order_status", ASCENDING), ("order_id", DESCENDING)])
+            newest = await self.archive.find_one({}, {"order_id": 1}, sort=[("order_id", DESCENDING)])
+            if newest:
+                self._archive_high_water = newest["order_id"]
         except Exception:
             pass
     
-    def insert_order(self, order_data: Dict):
-        validate_data(order_data,create_order_schema)
-        now_iso = datetime.now().isoformat()
-        order_data.setdefault("created_at", now_iso)
+    async def place_order(
+        self, order_data: Dict, quantities: Dict[str, int], product_repo, cart_repo=None
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """Đặt hàng: trừ tồn kho, ghi đơn và làm trống giỏ hàng của user.
+
+        Trên replica set/sharded cluster ba bước chạy trong một transaction
+        (`with_transaction` tự retry khi gặp lỗi tạm thời và khi commit không rõ
+        kết quả), nên không bao giờ có đơn mà chưa trừ kho hay ngược lại. Trên
+        server standalone chạy tuần tự và tự bù trừ tồn kho nếu ghi đơn lỗi.
+
+        Args:
+            order_data: đơn hàng đã validate theo create_order_schema.
+            quantities: code -> số lượng cần trừ.
+            cart_repo: nếu có thì làm trống giỏ hàng của order_data["user_id"].
+
+        Rollup doanh số được cộng sau khi đơn đã ghi, ngoài transaction: mọi đơn
+        trong ngày cùng ghi một document rollup, đưa vào transaction sẽ gây
+        write conflict liên tục giữa các đơn đặt đồng thời.
+
+        Returns:
+            (đơn vừa tạo, None) nếu thành công, (None, code thiếu hàng) nếu hết hàng.
+        """
+        order_data.setdefault("created_at", datetime.now().isoformat())
+        if await self.supports_transactions():
+            created, short_code = await self._place_order_transaction(order_data, quantities, product_repo, cart_repo)
+        else:
+            created, short_code = await self._place_order_sequential(order_data, quantities, product_repo, cart_repo)
+        if created is not None:
+            if self.sales_repo is not None:
+                await self.sales_repo.record_order(created)
+            event_bus.publish("order.created", _order_summary(created))
+        return created, short_code
+
+    async def supports_transactions(self) -> bool:
+        """Server có hỗ trợ multi-document transaction không (kiểm tra một lần)."""
+        if self._transactions_supported is None:
+            hello = await self.client.admin.command("hello")
+            self._transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        return self._transactions_supported
+
+    async def _place_order_transaction(self, order_data, quantities, product_repo, cart_repo):
+        async def _write(session):
+            reserved, short_code = await product_repo.reserve_stock(quantities, session=session)
+            if not reserved:
+                raise _OutOfStock(short_code)
+            await self.order.insert_one(order_data, session=session)
+            if cart_repo is not None:
+                await cart_repo.clear_cart(order_data["user_id"], session=session)
+
+        async with self.client.start_session() as session:
+            try:
+                await session.with_transaction(
+                    _write,
+                    read_concern=ReadConcern("snapshot"),
+                    write_concern=WriteConcern("majority"),
+                )
+            except _OutOfStock as e:
+                order_data.pop("_id", None)
+                return None, e.code
+        product_repo.catalog_cache.invalidate()
+        product_repo.publish_stock_change({code: -quantity for code, quantity in quantities.items()})
+        return order_data, None
+
+    async def _place_order_sequential(self, order_data, quantities, product_repo, cart_repo):
+        reserved, short_code = await product_repo.reserve_stock(quantities)
+        if not reserved:
+            return None, short_code
         try:
-            result = self.order.insert_one(order_data)
-            return result.inserted_id
+            await self.order.insert_one(order_data)
         except Exception:
-            pass
-    def get_order_by_id(self, order_id: str) -> Dict:
-        """Fetch one order by order_id."""
-        return self.order.find_one({"order_id": order_id})
-    def get_orders_by_filter(self, filter: Dict) -> Dict:
+            await product_repo.release_stock(quantities)
+            raise
+        if cart_repo is not None:
+            await cart_repo.clear_cart(order_data["user_id"])
+        return order_data, None
+
+    def new_order_id(self) -> str:
+        """Order ID mới: "ORD" + Snowflake ID 19 chữ số.
+
+        Độ dài cố định nên thứ tự chuỗi trùng thứ tự thời gian, insert luôn rơi
+        vào cuối index order_id; ID dạng cũ "ORD-..." luôn nhỏ hơn mọi ID mới.
+        """
+        return f"ORD{self.id_generator.next_id():019d}"
+
+    def _archive_bound(self) -> str:
+        """Mọi order_id trong archive đều nhỏ hơn giá trị này.
+
+        archive_orders chỉ chuyển đơn có order_id nhỏ hơn mốc cắt lúc chạy, và mốc
+        cắt chỉ tăng theo thời gian; high water giữ đúng cả khi tăng
+        ORDER_ARCHIVE_AFTER_DAYS (mốc cắt lùi lại) rồi khởi động lại.
+        """
+        now_ms = time.time_ns() // 1_000_000
+        cutoff = f"ORD{snowflake_floor(now_ms - Config.ORDER_ARCHIVE_AFTER_DAYS * 86_400_000):019d}"
+        # high water là order_id đã có trong archive, cần "lớn hơn" nó: thêm một ký tự
+        return max(cutoff, self._archive_high_water + "\0") if self._archive_high_water else cutoff
+
+    def _may_be_archived(self, query: Dict) -> bool:
+        """Query có thể khớp đơn trong archive không (theo order_status / order_id trong filter)."""
+        status = query.get("order_status")
+        if isinstance(status, str) and status not in self.TERMINAL_STATUSES:
+            return False
+        order_id = query.get("order_id")
+        if isinstance(order_id, str) and order_id >= self._archive_bound():
+            return False
+        return True
+
+    async def get_order_by_id(self, order_id: str) -> Dict:
+        """Fetch one order by order_id, tìm tiếp trong archive nếu order_id đủ cũ."""
+        order = await self.order.find_one({"order_id": order_id})
+        if order is None and self._may_be_archived({"order_id": order_id}):
+            order = await self.archive.find_one({"order_id": order_id})
+        return order
+    async def get_orders_by_filter(
+        self, filter: Dict, projection: Optional[Dict] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch orders by filter, newest first (order_id giảm dần), paged by the `after` cursor.
+
+        Luôn phân trang: thiếu `num` thì lấy ORDER_PAGE_SIZE, tối đa ORDER_MAX_PAGE_SIZE.
+        Đọc collection order trước; archive chỉ được truy vấn khi trang chạm tới
+        vùng order_id cũ (đơn cuối trang nhỏ hơn _archive_bound, hoặc order đã hết)
+        và filter có thể khớp đơn đã archive. Hai nguồn được trộn theo order_id,
+        cursor vẫn là order_id nên trang sau tiếp tục đúng chỗ trên cả hai.
+        """
+        filter = filter or {}
+        num = min(filter.get("num") or Config.ORDER_PAGE_SIZE, Config.ORDER_MAX_PAGE_SIZE)
+        query = self._build_query(filter)
+        after = filter.get("after")
+        orders, next_cursor = await find_page(
+            self.order, query, "order_id", DESCENDING,
+            after=after, num=num, projection=projection, unique=True,
+        )
+        if not self._may_be_archived(query):
+            return orders, next_cursor
+        if next_cursor is not None and orders[-1]["order_id"] >= self._archive_bound():
+            return orders, next_cursor
+
+        archived, archive_cursor = await find_page(
+            self.archive, query, "order_id", DESCENDING,
+            after=after, num=num, projection=projection, unique=True,
+        )
+        if not archived:
+            return orders, next_cursor
+        # Đơn đang được chuyển có thể nằm ở cả hai nơi trong chốc lát: giữ bản ở order
+        merged = {order["order_id"]: order for order in archived}
+        merged.update((order["order_id"], order) for order in orders)
+        ordered = sorted(merged.values(), key=lambda order: order["order_id"], reverse=True)
+        page = ordered[:num]
+        has_more = next_cursor is not None or archive_cursor is not None or len(ordered) > num
+        return page, encode_cursor(page[-1], "order_id") if has_more else None
+
+    def export_cursor(self, filter: Dict, projection: Optional[Dict] = None):
+        """Cursor không phân trang cho export (order rồi tới order_archive), đọc theo từng batch EXPORT_BATCH_SIZE."""
+        query = self._build_query(filter or {})
+        return self.find_all(query, projection)
+
+    async def find_all(self, query: Dict, projection: Optional[Dict] = None):
+        """Duyệt mọi đơn khớp query ở order và order_archive (theo _id trong từng collection)."""
+        for collection in (self.order, self.archive):
+            cursor = collection.find(query, projection).sort("_id", ASCENDING).batch_size(Config.EXPORT_BATCH_SIZE)
+            async for order in cursor:
+                yield order
+    def _build_query(self, filter: Dict) -> Dict:
+        """Chuyển filter của API thành Mongo query (bỏ key rỗng và trường phân trang)."""
         query : Dict = {
             k: v
-            for k, v in (filter or {}).items()
-            if v not in (None, "") and k not in ("start", "num")
+            for k, v in filter.items()
+            if v not in (None, "") and k not in ("after", "num")
         }
         # Map API filter field 'customer_id' to stored field 'user_id' if present
         if "customer_id" in query:
             query["user_id"] = query.pop("customer_id")
-        cursor = self.order.find(query)
-        start = filter.get("start")
-        num = filter.get("num")
-        # lấy num sản phẩm tính từ start
-        if start is not None and num is not None:
-            start = max(start, 1)
-            num = max(num, 1)
-            cursor = cursor.skip(start-1).limit(num)
-        return list(cursor)
-    def delete_order_by_id(self, order_id: str) -> bool:
-        """Delete one order by order_id."""
-        result = self.order.delete_one({"order_id": order_id})
-        return result.deleted_count > 0
+        return query
+    async def delete_order_by_id(self, order_id: str) -> bool:
+        """Delete one order by order_id (ở order hoặc order_archive)."""
+        deleted = await self.order.find_one_and_delete({"order_id": order_id})
+        if deleted is None and self._may_be_archived({"order_id": order_id}):
+            deleted = await self.archive.find_one_and_delete({"order_id": order_id})
+        if deleted is None:
+            return False
+        if self.sales_repo is not None:
+            await self.sales_repo.record_removal(deleted)
+        event_bus.publish("order.deleted", {"order_id": order_id})
+        return True
     
-    def update_order(self, order_id: str, update_data: Dict) -> bool:
-        """Update order by order_id."""
+    async def update_order(self, order_id: str, update_data: Dict) -> bool:
+        """Update order by order_id (ở order hoặc order_archive).
+
+        Chỉ ghi khi có trường thực sự thay đổi (như modified_count > 0); lấy bản
+        trước khi sửa trong cùng lệnh để cập nhật rollup khi order_status đổi.
+        updated_at đổi ở mỗi lần ghi để archiver biết đơn bị sửa trong lúc chuyển.
+        Đơn trong archive bị chuyển về trạng thái chưa kết thúc thì được đưa lại
+        collection order (xem _restore_archived).
+        """
         if not update_data:
             return False
+        filter = {"order_id": order_id, "$or": [{k: {"$ne": v}} for k, v in update_data.items()]}
+        update = {"$set": {**update_data, "updated_at": datetime.now().isoformat()}}
         try:
-            result = self.order.update_one(
-                {"order_id": order_id},
-                {"$set": update_data}
-            )
-            return result.modified_count > 0
+            before = await self.order.find_one_and_update(filter, update, return_document=ReturnDocument.BEFORE)
+            if before is None and self._may_be_archived({"order_id": order_id}):
+                status = update_data.get("order_status")
+                if status is not None and status not in self.TERMINAL_STATUSES:
+                    before = await self._restore_archived(filter, update["$set"])
+                else:
+                    before = await self.archive.find_one_and_update(filter, update, return_document=ReturnDocument.BEFORE)
         except Exception:
             return False
+        if before is None:
+            return False
+        if "order_status" in update_data and self.sales_repo is not None:
+            await self.sales_repo.record_status_change(before, update_data["order_status"])
+        event_bus.publish("order.updated", {"order_id": order_id, **update_data})
+        return True
+
+    async def _restore_archived(self, filter: Dict, changes: Dict) -> Optional[Dict]:
+        """Đưa đơn trong archive (khớp `filter`) về collection order cùng với `changes`.
+
+        Archive chỉ chứa đơn success/cancelled và _may_be_archived bỏ qua archive
+        khi lọc theo trạng thái chưa kết thúc, nên đơn để lại archive với trạng
+        thái đó sẽ biến mất khỏi danh sách lọc theo trạng thái. Ghi vào order
+        trước rồi mới xóa khỏi archive, nên đơn không bao giờ biến mất giữa chừng
+        (đọc theo order_id luôn ưu tiên order).
+
+        Returns:
+            Bản trong archive trước khi sửa, hoặc None nếu không có đơn khớp.
+        """
+        before = await self.archive.find_one(filter)
+        if before is None:
+            return None
+        await self.order.replace_one({"order_id": before["order_id"]}, {**before, **changes}, upsert=True)
+        await self.archive.delete_one({"_id": before["_id"]})
+        return before
+
+    async def archive_orders(self, older_than_days: Optional[int] = None) -> int:
+        """Chuyển đơn success/cancelled cũ hơn `older_than_days` ngày sang order_archive.
+
+        Mỗi batch ORDER_ARCHIVE_BATCH_SIZE đơn: một bulk_write ReplaceOne (upsert) vào
+        archive rồi một bulk_write DeleteOne ở order. Ghi archive trước nên đơn
+        không bao giờ biến mất giữa chừng, và chạy lại sau khi lỗi vẫn an toàn.
+        DeleteOne kèm updated_at lúc đọc: đơn bị update_order sửa trong lúc chuyển
+        được giữ lại ở order và bản cũ trong archive bị xóa.
+
+        Returns:
+            int: số đơn đã chuyển.
+        """
+        days = Config.ORDER_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff_ms = time.time_ns() // 1_000_000 - days * 86_400_000
+        query = {
+            "order_status": {"$in": list(self.TERMINAL_STATUSES)},
+            "order_id": {"$lt": f"ORD{snowflake_floor(cutoff_ms):019d}"},
+            # Đơn có order_id dạng cũ ("ORD-...") luôn nhỏ hơn mốc: xét thêm created_at
+            "created_at": {"$lt": (datetime.now() - timedelta(days=days)).isoformat()},
+        }
+        moved = 0
+        while True:
+            batch = await self.order.find(query).sort("order_id", ASCENDING).limit(
+                Config.ORDER_ARCHIVE_BATCH_SIZE
+            ).to_list()
+            if not batch:
+                break
+            await self.archive.bulk_write(
+                [ReplaceOne({"order_id": order["order_id"]}, order, upsert=True) for order in batch],
+                ordered=False,
+            )
+            self._archive_high_water = max(self._archive_high_water, batch[-1]["order_id"])
+            result = await self.order.bulk_write(
+                [DeleteOne({"_id": order["_id"], "updated_at": order.get("updated_at")}) for order in batch],
+                ordered=False,
+            )
+            moved += result.deleted_count
+            if result.deleted_count < len(batch):
+                changed = await self.order.find(
+                    {"_id": {"$in": [order["_id"] for order in batch]}}, {"order_id": 1}
+                ).to_list()
+                await self.archive.delete_many({"order_id": {"$in": [order["order_id"] for order in changed]}})
+            if len(batch) < Config.ORDER_ARCHIVE_BATCH_SIZE:
+                break
+        return moved
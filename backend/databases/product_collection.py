@@ -1,116 +1,554 @@
+import asyncio
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from bson import ObjectId
-from jsonschema import validate, ValidationError
-from pymongo.errors import DuplicateKeyError
+from pymongo import ASCENDING, DESCENDING, TEXT, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
+from config import Config
 from backend.constants.mongodb_constants import MongoCollections
 from backend.databases.mongodb import MongoDB
+from backend.misc.events import event_bus
 from backend.models.product import create_product_schema, update_product_schema
+from backend.utils.cache import TTLCache
+from backend.utils.pagination import find_page
+from backend.utils.text import to_search_text
 from backend.utils.validation import validate_data
 
 
 class ProductRepository:
+    # Trường được đưa vào text index (đã bỏ dấu) và trọng số khi xếp hạng kết quả
+    SEARCH_WEIGHTS = {"name": 10, "category": 5, "description": 1}
+    SEARCH_LIMIT = 20
+    # Giá trị của tham số sort -> (trường sắp xếp, chiều); mặc định "newest"
+    SORT_OPTIONS = {
+        "newest": ("created_at", DESCENDING),
+        "price": ("sell_price", ASCENDING),
+        "-price": ("sell_price", DESCENDING),
+        "name": ("name", ASCENDING),
+    }
+    # Mốc khoảng giá (VND) cho facet, bắt đầu từ 0; khoảng cuối là "từ mốc cuối trở lên"
+    PRICE_BUCKETS = [0, 100_000, 500_000, 1_000_000, 5_000_000, 10_000_000]
+    # Product trả về sau khi ghi (PATCH/active/inactive/delete): bỏ trường search nội bộ
+    RESPONSE_PROJECTION = {"search": 0}
+    # Trường cần khi kiểm tra/tính tiền các dòng của đơn hàng
+    ORDER_LOOKUP_PROJECTION = {
+        "_id": 0, "code": 1, "name": 1, "sell_price": 1, "import_price": 1,
+        "category": 1, "total_quantity": 1, "status": 1,
+    }
+    # Tham số lọc theo khoảng -> (trường, toán tử)
+    RANGE_FILTERS = {
+        "min_price": ("sell_price", "$gte"),
+        "max_price": ("sell_price", "$lte"),
+        "min_quantity": ("total_quantity", "$gte"),
+        "max_quantity": ("total_quantity", "$lte"),
+    }
+
     def __init__(self, db: MongoDB):
         self.product = db.get_collection(MongoCollections.product)
-        self._ensure_indexes()
+        # Cache kết quả danh sách sản phẩm; mọi thao tác ghi bên dưới đều invalidate
+        self.catalog_cache = TTLCache(
+            maxsize=Config.PRODUCT_CACHE_MAXSIZE, ttl=Config.PRODUCT_CACHE_TTL
+        )
 
-    def _ensure_indexes(self) -> None:
+    async def _ensure_indexes(self) -> None:
         """Create product indexes."""
+        # code là định danh của product (đơn hàng, giỏ hàng, tồn kho đều tra theo code):
+        # không tạo được unique index thì phải báo lỗi lúc khởi động, không được bỏ qua
+        await self.product.create_index("code", unique=True)
         try:
-            self.product.create_index("code", unique=True)
-            self.product.create_index("name")
-            self.product.create_index("category")
+            await self.product.create_index("category")
+            # Keyset pagination không điều kiện status (admin): mỗi kiểu sort một index
+            # (trường sort, _id); index (name, _id) phục vụ luôn lọc theo name
+            await self.product.create_index([("created_at", DESCENDING), ("_id", DESCENDING)])
+            await self.product.create_index([("sell_price", ASCENDING), ("_id", ASCENDING)])
+            await self.product.create_index([("name", ASCENDING), ("_id", ASCENDING)])
+            # Duyệt danh mục (luôn có status, thường có category) theo từng kiểu sort:
+            # equality trước, rồi tới trường sort/range, _id cuối cho keyset pagination
+            for prefix in ([("status", ASCENDING)], [("status", ASCENDING), ("category", ASCENDING)]):
+                await self.product.create_index(prefix + [("sell_price", ASCENDING), ("_id", ASCENDING)])
+                await self.product.create_index(prefix + [("created_at", DESCENDING), ("_id", DESCENDING)])
+            await self.product.create_index([("status", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)])
+            # Inverted index cho /products?q=, trên bản không dấu của name/category/description
+            await self.product.create_index(
+                [(f"search.{field}", TEXT) for field in self.SEARCH_WEIGHTS],
+                weights={f"search.{field}": w for field, w in self.SEARCH_WEIGHTS.items()},
+                default_language="none",
+                name="product_search",
+            )
         except Exception:
             pass
 
 
-    def insert_product(self, product_data: Dict):
-        """Insert a new product document."""
-        validate_data(product_data, create_product_schema)
+    async def insert_product(self, product_data: Dict, validated: bool = False) -> Dict:
+        """Insert a new product document.
+
+        Args:
+            validated: True nếu caller đã validate theo create_product_schema,
+                để mỗi payload chỉ validate một lần.
+
+        Returns:
+            Document vừa insert (đã có `_id` do driver gán, bỏ phần `search` nội bộ),
+            để caller không phải đọc lại từ DB.
+        """
+        if not validated:
+            validate_data(product_data, create_product_schema)
 
         now_iso = datetime.now().isoformat()
         product_data.setdefault("created_at", now_iso)
         product_data.setdefault("updated_at", now_iso)
+        product_data["search"] = self._search_fields(product_data)
 
         try:
-            result = self.product.insert_one(product_data)
-            return result.inserted_id
+            result = await self.product.insert_one(product_data)
         except DuplicateKeyError:
             raise ValueError(f"Product '{product_data.get('code')}' da ton tai")
+        self.catalog_cache.invalidate()
+        return {k: v for k, v in product_data.items() if k != "search"}
+
+    async def insert_products(self, products_data: List[Dict]) -> Tuple[int, List[Tuple[int, str]]]:
+        """Insert many already-validated products in one unordered batch.
+
+        Returns:
+            Số sản phẩm đã insert và danh sách (vị trí trong batch, lỗi) của các
+            sản phẩm bị từ chối (VD: trùng code).
+        """
+        if not products_data:
+            return 0, []
 
-    def get_product_by_code(self, code: str) -> Optional[Dict]:
+        now_iso = datetime.now().isoformat()
+        for product_data in products_data:
+            product_data.setdefault("created_at", now_iso)
+            product_data.setdefault("updated_at", now_iso)
+            product_data["search"] = self._search_fields(product_data)
+
+        try:
+            result = await self.product.insert_many(products_data, ordered=False)
+            inserted, errors = len(result.inserted_ids), []
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            errors = []
+            for write_error in e.details.get("writeErrors", []):
+                index = write_error["index"]
+                if write_error.get("code") == 11000:
+                    message = f"Product '{products_data[index].get('code')}' da ton tai"
+                else:
+                    message = write_error.get("errmsg", "Khong the insert product")
+                errors.append((index, message))
+        if inserted:
+            self.catalog_cache.invalidate()
+        return inserted, errors
+
+    async def get_product_by_code(self, code: str, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Fetch one product by code."""
-        return self.product.find_one({"code": code})
+        return await self.product.find_one({"code": code}, projection)
+
+    async def get_products_by_codes(self, codes) -> Dict[str, Dict]:
+        """Fetch many products by code in one `$in` query, keyed by code.
+
+        Chỉ lấy các trường cần để kiểm tra và tính tiền đơn hàng; code không
+        tồn tại thì không có trong kết quả.
+        """
+        cursor = self.product.find({"code": {"$in": list(set(codes))}}, self.ORDER_LOOKUP_PROJECTION)
+        return {product["code"]: product async for product in cursor}
 
-    def get_product_by_object_id(self, object_id) -> Optional[Dict]:
+    async def get_product_by_object_id(self, object_id) -> Optional[Dict]:
         """Fetch one product by ObjectId."""
-        return self.product.find_one({"_id": ObjectId(object_id)})
+        return await self.product.find_one({"_id": ObjectId(object_id)})
 
-    def get_all_products(self) -> List[Dict]:
+    async def get_all_products(self) -> List[Dict]:
         """Fetch all products."""
-        return list(self.product.find())
+        return await self.product.find().to_list()
 
-    def get_products_by_supplier(self, supplier_id: str) -> List[Dict]:
+    async def get_products_by_supplier(self, supplier_id: str) -> List[Dict]:
         """Fetch all products belonging to a supplier."""
-        return list(self.product.find({"supplier_id": supplier_id}))
-    def get_products_by_filter(self, filter: Dict) -> List[Dict]:
-        """Find products by a flexible filter with optional pagination.
+        return await self.product.find({"supplier_id": supplier_id}).to_list()
+    async def get_products_by_filter(
+        self,
+        filter: Dict,
+        projection: Optional[Dict] = None,
+        predicates: Optional[Dict] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Find products by a flexible filter with keyset pagination.
 
         Args:
             filter: dict các điều kiện tìm kiếm (VD: {"code": "PRD001", "status": "active"}).
+                `after` là next_cursor của trang trước, `num` là số sản phẩm mỗi trang
+                (thiếu thì lấy PRODUCT_PAGE_SIZE, tối đa PRODUCT_MAX_PAGE_SIZE),
+                `sort` là một key của SORT_OPTIONS, min_/max_price và min_/max_quantity
+                lọc theo khoảng trên sell_price/total_quantity.
+            projection: các trường view cần, để Mongo không gửi về trường thừa.
+            predicates: điều kiện bắt buộc của view (VD: chỉ sản phẩm active),
+                kết hợp AND với filter.
 
         Returns:
-            Danh sách sản phẩm match filter.
+            Danh sách sản phẩm match filter và next_cursor (None nếu hết trang).
         """
 
-        # Xây dựng điều kiện lọc từ dict; bỏ qua key None/"" và bỏ cả các trường start/end
+        filter = filter or {}
+        sort = filter.get("sort") or "newest"
+        if sort not in self.SORT_OPTIONS:
+            raise ValueError(f"sort không hợp lệ. Phải là một trong: {', '.join(self.SORT_OPTIONS)}")
+        sort_key, direction = self.SORT_OPTIONS[sort]
+
+        query = self._build_query(filter, predicates)
+
+        # Có từ khóa tìm kiếm: xếp hạng theo độ liên quan, không phân trang bằng cursor
+        if filter.get("q"):
+            return await self._search_products(query, filter["q"], filter.get("num"), projection), None
+
+        return await find_page(
+            self.product, query, sort_key, direction,
+            after=filter.get("after"), num=self._page_size(filter.get("num")), projection=projection,
+        )
+
+    @staticmethod
+    def _page_size(num: Optional[int]) -> int:
+        """Số sản phẩm mỗi trang: luôn phân trang để không kéo (và cache) cả catalog."""
+        return min(num or Config.PRODUCT_PAGE_SIZE, Config.PRODUCT_MAX_PAGE_SIZE)
+
+    def _build_query(self, filter: Dict, predicates: Optional[Dict] = None) -> Dict:
+        """Chuyển filter (và predicates của view) thành Mongo query, chưa gồm `q`."""
+        # Bỏ qua key None/"" và bỏ cả các trường phân trang/sort/khoảng
         query: Dict = {
             k: v
-            for k, v in (filter or {}).items()
-            if v not in (None, "") and k not in ("start", "num", "supplier_name")
+            for k, v in filter.items()
+            if v not in (None, "")
+            and k not in ("after", "num", "supplier_name", "q", "sort")
+            and k not in self.RANGE_FILTERS
         }
+        for key, (field, op) in self.RANGE_FILTERS.items():
+            if filter.get(key) is not None:
+                query.setdefault(field, {})[op] = filter[key]
+        if predicates:
+            query = {"$and": [query, predicates]} if query else dict(predicates)
+        return query
+
+    def export_cursor(self, filter: Dict, projection: Optional[Dict] = None):
+        """Cursor không phân trang cho export, Mongo trả về theo từng batch EXPORT_BATCH_SIZE."""
+        query = self._build_query(filter or {})
+        return self.product.find(query, projection).sort("_id", ASCENDING).batch_size(Config.EXPORT_BATCH_SIZE)
+
+    async def get_facets(self, filter: Dict, predicates: Optional[Dict] = None) -> Dict:
+        """Đếm sản phẩm theo category, supplier và khoảng giá cho filter hiện tại.
+
+        Dùng một aggregation `$facet` duy nhất, thay vì kéo toàn bộ sản phẩm về.
+        """
+        filter = filter or {}
+        query = self._build_query(filter, predicates)
+        if filter.get("q"):
+            terms = to_search_text(filter["q"])
+            # Như _search_products: từ khóa chỉ gồm ký tự bị bỏ khi chuẩn hóa thì không khớp gì
+            if not terms:
+                return {"categories": [], "suppliers": [], "price_ranges": []}
+            query = {**query, "$text": {"$search": terms}}
+
+        boundaries = self.PRICE_BUCKETS
+        pipeline = [
+            {"$match": query},
+            {"$facet": {
+                "categories": [
+                    {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                ],
+                "suppliers": [
+                    {"$group": {"_id": "$supplier_id", "count": {"$sum": 1}}},
+                    {"$sort": {"count": -1, "_id": 1}},
+                ],
+                "price_ranges": [
+                    # Chỉ giá là số >= mốc đầu: thiếu giá, null, chuỗi hay giá âm
+                    # mà rơi vào bucket default sẽ bị đếm nhầm thành "từ mốc cuối trở lên"
+                    {"$match": {"sell_price": {"$gte": boundaries[0]}}},
+                    {"$bucket": {
+                        "groupBy": "$sell_price",
+                        "boundaries": boundaries,
+                        "default": boundaries[-1],
+                        "output": {"count": {"$sum": 1}},
+                    }},
+                ],
+            }},
+        ]
+        cursor = await self.product.aggregate(pipeline)
+        facets = (await cursor.to_list())[0]
+
+        upper = dict(zip(boundaries, boundaries[1:]))
+        return {
+            "categories": [{"value": f["_id"], "count": f["count"]} for f in facets["categories"]],
+            "suppliers": [{"value": f["_id"], "count": f["count"]} for f in facets["suppliers"]],
+            "price_ranges": [
+                {"min": f["_id"], "max": upper.get(f["_id"]), "count": f["count"]}
+                for f in facets["price_ranges"]
+            ],
+        }
+
+    async def get_cached_facets(self, filter: Dict, role: str, predicates: Optional[Dict] = None) -> Dict:
+        """Như get_facets nhưng đọc qua catalog cache (cùng cơ chế invalidate)."""
+        # Phân trang và sort không ảnh hưởng số đếm
+        facet_filter = {k: v for k, v in (filter or {}).items() if k not in ("after", "num", "sort")}
+        key = ("facets",) + self._cache_key(facet_filter, role)
+        cached = self.catalog_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self.catalog_cache.generation
+        result = await self.get_facets(facet_filter, predicates)
+        self.catalog_cache.set(key, result, generation)
+        return result
+
+    @staticmethod
+    def _cache_key(filter: Dict, role: str) -> Tuple:
+        """Key cache: role + filter đã chuẩn hóa (bỏ giá trị rỗng, sắp xếp theo tên trường)."""
+        return (
+            role,
+            tuple(sorted((k, v) for k, v in (filter or {}).items() if v not in (None, ""))),
+        )
+
+    async def _search_products(
+        self, query: Dict, text: str, num: Optional[int], projection: Optional[Dict]
+    ) -> List[Dict]:
+        """Tìm sản phẩm không phân biệt dấu qua text index, sắp xếp theo textScore."""
+        terms = to_search_text(text)
+        if not terms:
+            return []
+        query = {**query, "$text": {"$search": terms}}
+
+        score = {"$meta": "textScore"}
+        if projection and any(v for k, v in projection.items() if k != "_id"):
+            projection = {**projection, "_id": 1}
+        projection = {**(projection or {}), "score": score}
+
+        limit = min(max(num or self.SEARCH_LIMIT, 1), 100)
+        cursor = self.product.find(query, projection).sort([("score", score)]).limit(limit)
+        return await cursor.to_list()
+
+    async def rebuild_search_index(self, batch_size: int = 1000, only_missing: bool = True) -> int:
+        """Tính trường search cho sản phẩm chưa có (dữ liệu tạo trước khi có tìm kiếm).
+
+        Args:
+            only_missing: False để tính lại cho mọi sản phẩm (VD: sau khi đổi cách chuẩn hóa).
+
+        Returns:
+            Số sản phẩm đã cập nhật
+        """
+        updated = 0
+        requests = []
+        fields = {field: 1 for field in self.SEARCH_WEIGHTS}
+        query = {"search": {"$exists": False}} if only_missing else {}
+        async for product in self.product.find(query, fields):
+            requests.append(UpdateOne(
+                {"_id": product["_id"]},
+                {"$set": {"search": self._search_fields(product)}},
+            ))
+            if len(requests) >= batch_size:
+                result = await self.product.bulk_write(requests, ordered=False)
+                updated += result.modified_count
+                requests = []
+        if requests:
+            result = await self.product.bulk_write(requests, ordered=False)
+            updated += result.modified_count
+        if updated:
+            self.catalog_cache.invalidate()
+        return updated
 
-        cursor = self.product.find(query)
-        start = filter.get("start")
-        num = filter.get("num")
-        # lấy num sản phẩm tính từ start
-        if start is not None and num is not None:
-            start = max(start, 0)
-            num = max(num, 1)
-            cursor = cursor.skip(start).limit(num)
-        return list(cursor)
-    
-    def update_product(self, code: str, update_data: Dict) -> bool:
+    def _search_fields(self, data: Dict) -> Dict:
+        """Bản không dấu của các trường tìm kiếm có trong data."""
+        return {
+            field: to_search_text(data[field])
+            for field in self.SEARCH_WEIGHTS
+            if isinstance(data.get(field), str)
+        }
+
+    async def get_cached_products_by_filter(
+        self,
+        filter: Dict,
+        role: str,
+        projection: Optional[Dict] = None,
+        predicates: Optional[Dict] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Như get_products_by_filter nhưng đọc qua catalog cache.
+
+        Key gồm cả role, vì mỗi role có projection/predicates riêng. Mỗi entry
+        chỉ là một trang; `num` được chuẩn hóa trước khi tạo key để request
+        không truyền num và request truyền đúng PRODUCT_PAGE_SIZE dùng chung entry.
+        """
+        filter = filter or {}
+        if not filter.get("q"):
+            filter = {**filter, "num": self._page_size(filter.get("num"))}
+        key = self._cache_key(filter, role)
+        cached = self.catalog_cache.get(key)
+        if cached is not None:
+            return cached
+
+        generation = self.catalog_cache.generation
+        result = await self.get_products_by_filter(filter, projection, predicates)
+        self.catalog_cache.set(key, result, generation)
+        return result
+
+    async def update_product(self, code: str, update_data: Dict) -> bool:
         """Update product fields."""
+        result = await self.product.update_one({"code": code}, {"$set": self._prepare_update(update_data)})
+        if result.modified_count:
+            self.catalog_cache.invalidate()
+        return result
+
+    async def find_and_update_product(
+        self, code: str, update_data: Dict, expected: Optional[Dict] = None
+    ) -> Optional[Dict]:
+        """Cập nhật nguyên tử và trả về product sau khi cập nhật (một round trip).
+
+        Args:
+            expected: điều kiện thêm mà product phải thỏa tại thời điểm ghi
+                (VD: {"status": "active"}); không thỏa thì không ghi gì.
+
+        Returns:
+            Product sau cập nhật, hoặc None nếu không có product nào khớp code + expected.
+        """
+        product = await self.product.find_one_and_update(
+            {**(expected or {}), "code": code},
+            {"$set": self._prepare_update(update_data)},
+            projection=self.RESPONSE_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        if product:
+            self.catalog_cache.invalidate()
+            if "total_quantity" in update_data:
+                # Admin đặt lại tồn kho: gửi giá trị tuyệt đối thay vì delta
+                event_bus.publish("stock.changed", {
+                    "changes": [{"code": code, "total_quantity": product.get("total_quantity")}]
+                })
+        return product
+
+    async def set_product_status(self, code: str, status: str) -> Tuple[Optional[Dict], bool]:
+        """Chuyển status của product, chỉ ghi khi status hiện tại khác `status`.
+
+        Returns:
+            (product, changed): product sau cập nhật và True nếu đã chuyển; nếu đã
+            ở sẵn `status` thì là product hiện tại và False; (None, False) nếu không tồn tại.
+        """
+        product = await self.find_and_update_product(code, {"status": status}, {"status": {"$ne": status}})
+        if product:
+            return product, True
+        # Không ghi được: hoặc không tồn tại, hoặc đã ở sẵn trạng thái đích
+        return await self.get_product_by_code(code, self.RESPONSE_PROJECTION), False
+
+    def _prepare_update(self, update_data: Dict) -> Dict:
+        """Validate update và bổ sung updated_at cùng các trường search tương ứng."""
         validate_data(update_data, update_product_schema)
         if not update_data:
             raise ValueError("Khong co truong nao de cap nhat")
-        
-        update_data["updated_at"] = datetime.now().isoformat()
 
-        result = self.product.update_one({"code": code}, {"$set": update_data})
-        return result
+        update_data["updated_at"] = datetime.now().isoformat()
+        # Chỉ tính lại phần search của các trường thay đổi
+        for field, value in self._search_fields(update_data).items():
+            update_data[f"search.{field}"] = value
+        return update_data
 
-    def delete_product(self, code: str) -> bool:
+    async def delete_product(self, code: str) -> bool:
         """Delete a product if it is inactive."""
-        product = self.get_product_by_code(code)
+        product = await self.get_product_by_code(code, self.RESPONSE_PROJECTION)
         if not product:
             raise ValueError(f"Product '{code}' khong ton tai")
         if product.get("status") == "active":
             raise ValueError("Khong the xoa product dang active")
 
-        self.product.delete_one({"code": code})
+        await self.product.delete_one({"code": code})
+        self.catalog_cache.invalidate()
         return product
 
-    def decrease_quantity(self, code: str, quantity: int) -> bool:
-        """Decrease product quantity by given amount."""
-        if quantity <= 0:
-            return True
-        
-        result = self.product.update_one(
-            {"code": code},
-            {"$inc": {"total_quantity": -quantity}}
-        )
-        return result.modified_count > 0
+    async def reserve_stock(self, quantities: Dict[str, int], session=None) -> Tuple[bool, Optional[str]]:
+        """Trừ tồn kho cho nhiều sản phẩm, không bao giờ để tồn kho âm.
+
+        Mỗi dòng là một update có điều kiện `{"code": c, "total_quantity": {"$gte": q}}`
+        với `$inc: -q`; dòng thiếu hàng (hoặc product đã bị xóa) không khớp filter.
+
+        - Trong transaction (`session`): mọi dòng gửi trong một bulk_write, matched_count
+          nhỏ hơn số dòng nghĩa là có dòng không trừ được; trả về False để caller
+          abort transaction, rollback cả các dòng đã trừ.
+        - Không có transaction (server standalone): mỗi dòng một update_one chạy đồng
+          thời, nên biết chính xác dòng nào đã trừ; thiếu hàng thì cộng trả đúng các
+          dòng đó.
+
+        Args:
+            quantities: code -> số lượng cần trừ.
+            session: session của transaction đang chạy (OrderRepository.place_order).
+                Khi đó không tự bù trừ hay invalidate cache: caller abort để rollback
+                và invalidate sau khi commit.
+
+        Returns:
+            (True, None) nếu đã trừ đủ mọi dòng, ngược lại (False, code thiếu hàng
+            hoặc không còn tồn tại).
+        """
+        lines = [(code, quantity) for code, quantity in quantities.items() if quantity > 0]
+        if not lines:
+            return True, None
+
+        now_iso = datetime.now().isoformat()
+        updates = [
+            (
+                {"code": code, "total_quantity": {"$gte": quantity}},
+                {"$inc": {"total_quantity": -quantity}, "$set": {"updated_at": now_iso}},
+            )
+            for code, quantity in lines
+        ]
+
+        if session is not None:
+            result = await self.product.bulk_write(
+                [UpdateOne(filter, update) for filter, update in updates], ordered=True, session=session
+            )
+            if result.matched_count < len(lines):
+                return False, await self._first_short_line(lines)
+            return True, None
+
+        results = await asyncio.gather(*(
+            self.product.update_one(filter, update) for filter, update in updates
+        ))
+        reserved = {code: quantity for (code, quantity), result in zip(lines, results) if result.matched_count}
+        if len(reserved) < len(lines):
+            await self._restore_stock(reserved)
+            return False, next(code for code, _ in lines if code not in reserved)
+
+        self.catalog_cache.invalidate()
+        self.publish_stock_change({code: -quantity for code, quantity in lines})
+        return True, None
+
+    async def _first_short_line(self, lines: List[Tuple[str, int]]) -> str:
+        """Code đầu tiên không đủ hàng (hoặc không còn tồn tại), để báo lỗi cho client.
+
+        Đọc ngoài transaction (chưa commit nên không thấy phần vừa trừ); tồn kho có
+        thể vừa đổi nên chỉ dùng cho thông báo, mặc định là dòng đầu tiên.
+        """
+        stock = {
+            product["code"]: product.get("total_quantity") or 0
+            async for product in self.product.find(
+                {"code": {"$in": [code for code, _ in lines]}}, {"code": 1, "total_quantity": 1}
+            )
+        }
+        return next((code for code, quantity in lines if stock.get(code, 0) < quantity), lines[0][0])
+
+    async def release_stock(self, quantities: Dict[str, int]) -> None:
+        """Cộng trả tồn kho đã trừ bởi reserve_stock (đơn lỗi hoặc bị hủy)."""
+        if await self._restore_stock(quantities):
+            self.publish_stock_change(quantities)
+
+    async def _restore_stock(self, quantities: Dict[str, int]) -> bool:
+        """Cộng trả tồn kho mà không phát event (bù trừ cho phần reserve_stock chưa công bố)."""
+        operations = [
+            UpdateOne(
+                {"code": code},
+                {"$inc": {"total_quantity": quantity}, "$set": {"updated_at": datetime.now().isoformat()}},
+            )
+            for code, quantity in quantities.items()
+            if quantity > 0
+        ]
+        if not operations:
+            return False
+        await self.product.bulk_write(operations, ordered=False)
+        self.catalog_cache.invalidate()
+        return True
+
+    def publish_stock_change(self, deltas: Dict[str, int]) -> None:
+        """Phát event stock.changed: code -> lượng tồn kho vừa thay đổi (âm là bị trừ)."""
+        changes = [{"code": code, "delta": delta} for code, delta in deltas.items() if delta]
+        if changes:
+            event_bus.publish("stock.changed", {"changes": changes})
@@ -0,0 +1,266 @@
+import logging
+from datetime import date, datetime
+from typing import AsyncIterable, Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+from config import Config
+from backend.constants.enum import Order_Status
+from backend.constants.mongodb_constants import MongoCollections
+from backend.databases.mongodb import MongoDB
+
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY = ("day", "week", "month", "product", "category")
+# Map theo sản phẩm / danh mục trong document rollup
+BREAKDOWNS = {"product": "products", "category": "categories"}
+UNCATEGORIZED = "_uncategorized"
+METRICS = ("orders", "units", "revenue", "cost")
+
+
+def _field_key(value) -> str:
+    """Key an toàn cho map trong document: Mongo hiểu '.' là đường dẫn, '$' đầu là toán tử."""
+    key = str(value).replace(".", "_") if value not in (None, "") else UNCATEGORIZED
+    return "_" + key[1:] if key.startswith("$") else key
+
+
+def order_day(order: Dict) -> Optional[str]:
+    """Ngày (YYYY-MM-DD) mà đơn được tính vào, theo created_at."""
+    created_at = order.get("created_at")
+    if isinstance(created_at, datetime):
+        return created_at.date().isoformat()
+    if isinstance(created_at, str) and len(created_at) >= 10:
+        return created_at[:10]
+    return None
+
+
+def order_contribution(order: Dict, products: Optional[Dict[str, Dict]] = None) -> Dict[str, float]:
+    """Các giá trị một đơn cộng vào rollup ngày của nó, dạng {đường dẫn: số} dùng cho $inc.
+
+    Giá vốn và danh mục lấy từ bản chụp trên từng dòng (category, import_price lúc
+    đặt hàng); đơn cũ không có bản chụp thì tra `products` (code -> sản phẩm).
+    """
+    inc: Dict[str, float] = {"orders": 1, "units": 0, "revenue": 0, "cost": 0}
+    counted = set()
+    for item in order.get("items") or []:
+        code = item.get("product_id")
+        product = (products or {}).get(code) or {}
+        quantity = item.get("quantity") or 0
+        revenue = (item.get("price") or 0) * quantity
+        import_price = item.get("import_price", product.get("import_price"))
+        cost = (import_price or 0) * quantity
+        category = item.get("category", product.get("category"))
+
+        inc["units"] += quantity
+        inc["revenue"] += revenue
+        inc["cost"] += cost
+        for base in (f"products.{_field_key(code)}", f"categories.{_field_key(category)}"):
+            for metric, value in (("units", quantity), ("revenue", revenue), ("cost", cost)):
+                inc[f"{base}.{metric}"] = inc.get(f"{base}.{metric}", 0) + value
+            # Mỗi đơn chỉ tính một lần cho mỗi sản phẩm/danh mục dù có nhiều dòng
+            if base not in counted:
+                counted.add(base)
+                inc[f"{base}.orders"] = 1
+    return inc
+
+
+def _nest(inc: Dict[str, float]) -> Dict:
+    """{"a.b.c": v} -> {"a": {"b": {"c": v}}} để ghi nguyên document khi backfill."""
+    doc: Dict = {}
+    for path, value in inc.items():
+        *parents, leaf = path.split(".")
+        node = doc
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = value
+    return doc
+
+
+def _period_key(day: str, group_by: str) -> str:
+    if group_by == "month":
+        return day[:7]
+    if group_by == "week":
+        year, week, _ = date.fromisoformat(day).isocalendar()
+        return f"{year}-W{week:02d}"
+    return day
+
+
+def _accumulate(groups: Dict[str, Dict], key: str, entry: Dict) -> None:
+    group = groups.setdefault(key, dict.fromkeys(METRICS, 0))
+    for metric in METRICS:
+        group[metric] += entry.get(metric, 0)
+
+
+def _summary(entry: Dict) -> Dict:
+    revenue, cost = entry["revenue"], entry["cost"]
+    return {
+        **entry,
+        "revenue": round(revenue, 2),
+        "cost": round(cost, 2),
+        "margin": round(revenue - cost, 2),
+        "margin_rate": round((revenue - cost) / revenue, 4) if revenue else 0.0,
+    }
+
+
+class SalesRollupRepository:
+    """Rollup doanh số theo ngày trong collection sales_daily (_id = "YYYY-MM-DD").
+
+    Mỗi document gồm tổng orders/units/revenue/cost của các đơn chưa hủy tạo trong
+    ngày, map `products` và `categories` (key -> cùng các chỉ số) và `statuses`
+    (trạng thái -> số đơn, gồm cả đơn đã hủy). OrderRepository cập nhật rollup
+    bằng $inc mỗi khi đặt đơn, đổi trạng thái hoặc xóa đơn; `rebuild` tính lại từ
+    collection order (backfill hoặc sửa sai lệch).
+    """
+
+    def __init__(self, db: MongoDB):
+        self.rollup = db.get_collection(MongoCollections.sales_daily)
+
+    async def _ensure_indexes(self) -> None:
+        """_id là ngày nên truy vấn theo khoảng ngày dùng index _id, không cần index phụ."""
+
+    async def record_order(self, order: Dict) -> None:
+        """Cộng một đơn vừa đặt vào rollup ngày của nó."""
+        await self._record(order, 1)
+
+    async def record_removal(self, order: Dict) -> None:
+        """Trừ một đơn vừa bị xóa khỏi rollup."""
+        await self._record(order, -1)
+
+    async def record_status_change(self, order: Dict, new_status: str) -> None:
+        """Cập nhật rollup khi `order` (bản trước khi sửa) đổi sang `new_status`.
+
+        Đơn chuyển sang cancelled bị trừ khỏi doanh số, hủy -> trạng thái khác thì cộng lại.
+        """
+        old_status = order.get("order_status") or Order_Status.PROCESSING
+        day = order_day(order)
+        if day is None or old_status == new_status:
+            return
+        inc = {f"statuses.{_field_key(old_status)}": -1, f"statuses.{_field_key(new_status)}": 1}
+        if (old_status == Order_Status.CANCELLED) != (new_status == Order_Status.CANCELLED):
+            sign = 1 if old_status == Order_Status.CANCELLED else -1
+            for path, value in order_contribution(order).items():
+                inc[path] = sign * value
+        await self._apply(day, inc)
+
+    async def _record(self, order: Dict, sign: int) -> None:
+        day = order_day(order)
+        if day is None:
+            return
+        status = order.get("order_status") or Order_Status.PROCESSING
+        inc = {f"statuses.{_field_key(status)}": sign}
+        if status != Order_Status.CANCELLED:
+            for path, value in order_contribution(order).items():
+                inc[path] = sign * value
+        await self._apply(day, inc)
+
+    async def _apply(self, day: str, inc: Dict[str, float]) -> None:
+        # Lỗi rollup không được làm hỏng thao tác trên đơn đã ghi xong; rebuild sẽ sửa lại
+        try:
+            await self.rollup.update_one(
+                {"_id": day},
+                {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception:
+            logger.exception("Error update sales rollup %s", day)
+
+    async def rebuild(self, orders: AsyncIterable[Dict], product_repo=None,
+                      from_day: Optional[str] = None, to_day: Optional[str] = None) -> int:
+        """Tính lại rollup từ các đơn trong `orders` (cursor của collection order).
+
+        Ghi đè các ngày có đơn và xóa rollup của những ngày không còn đơn trong
+        khoảng [from_day, to_day] (cả collection nếu không truyền). Đơn cũ thiếu
+        bản chụp giá vốn/danh mục được tra theo sản phẩm hiện tại qua `product_repo`.
+        Chạy khi ít đơn mới, vì $inc đến trong lúc rebuild có thể bị ghi đè.
+
+        Returns:
+            int: số ngày đã ghi.
+        """
+        days: Dict[str, Dict[str, float]] = {}
+        batch: List[Dict] = []
+
+        async def flush():
+            products = {}
+            if product_repo is not None:
+                missing = {
+                    item.get("product_id")
+                    for order in batch for item in order.get("items") or []
+                    if "import_price" not in item or "category" not in item
+                }
+                if missing:
+                    products = await product_repo.get_products_by_codes(missing)
+            for order in batch:
+                day = order_day(order)
+                if day is None:
+                    continue
+                totals = days.setdefault(day, {})
+                status = order.get("order_status") or Order_Status.PROCESSING
+                key = f"statuses.{_field_key(status)}"
+                totals[key] = totals.get(key, 0) + 1
+                if status != Order_Status.CANCELLED:
+                    for path, value in order_contribution(order, products).items():
+                        totals[path] = totals.get(path, 0) + value
+            batch.clear()
+
+        async for order in orders:
+            batch.append(order)
+            if len(batch) >= Config.EXPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+
+        now = datetime.utcnow()
+        requests = [
+            ReplaceOne({"_id": day}, {**_nest(totals), "updated_at": now}, upsert=True)
+            for day, totals in days.items()
+        ]
+        for start in range(0, len(requests), Config.EXPORT_BATCH_SIZE):
+            await self.rollup.bulk_write(requests[start:start + Config.EXPORT_BATCH_SIZE], ordered=False)
+
+        stale: Dict = {"_id": {"$nin": list(days)}}
+        if from_day:
+            stale["_id"]["$gte"] = from_day
+        if to_day:
+            stale["_id"]["$lte"] = to_day
+        await self.rollup.delete_many(stale)
+        return len(days)
+
+    async def get_stats(self, from_day: str, to_day: str, group_by: str = "day") -> Dict:
+        """Doanh số trong [from_day, to_day] nhóm theo ngày/tuần/tháng/sản phẩm/danh mục.
+
+        Chỉ đọc tối đa một document rollup mỗi ngày, không quét collection order.
+        """
+        projection = dict.fromkeys(METRICS, 1)
+        breakdown = BREAKDOWNS.get(group_by)
+        if breakdown:
+            projection[breakdown] = 1
+        docs = await self.rollup.find(
+            {"_id": {"$gte": from_day, "$lte": to_day}}, projection
+        ).sort("_id", 1).to_list()
+
+        totals = dict.fromkeys(METRICS, 0)
+        groups: Dict[str, Dict] = {}
+        for doc in docs:
+            for metric in METRICS:
+                totals[metric] += doc.get(metric, 0)
+            if breakdown:
+                for key, entry in (doc.get(breakdown) or {}).items():
+                    _accumulate(groups, key, entry)
+            else:
+                _accumulate(groups, _period_key(doc["_id"], group_by), doc)
+
+        if breakdown:
+            # Sản phẩm/danh mục chỉ còn toàn số 0 (mọi đơn của nó đã hủy) thì bỏ qua
+            ordered = sorted(
+                ((key, entry) for key, entry in groups.items() if any(entry.values())),
+                key=lambda kv: -kv[1]["revenue"],
+            )
+        else:
+            ordered = groups.items()
+        return {
+            "from": from_day,
+            "to": to_day,
+            "group_by": group_by,
+            "totals": _summary(totals),
+            "groups": [{"key": key, **_summary(entry)} for key, entry in ordered],
+        }
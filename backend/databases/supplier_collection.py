@@ -1,85 +1,171 @@
 from backend.constants.mongodb_constants import MongoCollections
 from backend.databases.mongodb import MongoDB
+from pymongo import ASCENDING, ReturnDocument
 from pymongo.errors import DuplicateKeyError
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from bson import ObjectId
+from config import Config
 from backend.models.supplier import create_supplier_schema, update_supplier_schema
+from backend.utils.cache import TTLCache
+from backend.utils.pagination import find_page
 from backend.utils.validation import validate_data
 class SupplierRepository:
     def __init__(self, db: MongoDB):
         self.supplier = db.get_collection(MongoCollections.supplier)
-        self._ensure_indexes()
+        # Danh bạ supplier (ít, hiếm khi đổi) giữ trong bộ nhớ, tra theo code và name
+        self.directory_cache = TTLCache(maxsize=1, ttl=Config.SUPPLIER_CACHE_TTL)
 
-    def _ensure_indexes(self):
+    async def _ensure_indexes(self):
         """Tạo các chỉ mục cho collection"""
         try:
-            self.supplier.create_index("code", unique=True)
-            self.supplier.create_index("name")
+            await self.supplier.create_index("code", unique=True)
+            # Dùng cho tìm theo tên và keyset pagination theo (name, _id)
+            await self.supplier.create_index([("name", ASCENDING), ("_id", ASCENDING)])
         except Exception:
             pass
 
     
-    def insert_supplier(self, supplier_data: Dict):
+    async def insert_supplier(self, supplier_data: Dict, validated: bool = False) -> Dict:
         """
         Thêm một supplier mới
         
         Args:
             supplier_data: Dữ liệu supplier
+            validated: True nếu caller đã validate theo create_supplier_schema
             
         Returns:
-            ID của supplier vừa được tạo
+            Supplier vừa được tạo (đã có `_id` do driver gán)
             
         Raises:
             ValidationError: Nếu dữ liệu không hợp lệ
             ValueError: Nếu supplier đã tồn tại
         """
-        validate_data(supplier_data, create_supplier_schema) #Bad request _400 bao giờ tạo API route thì chuyen sang đấy sau
+        if not validated:
+            validate_data(supplier_data, create_supplier_schema) #Bad request _400 bao giờ tạo API route thì chuyen sang đấy sau
 
         now_iso = datetime.now().isoformat()
         supplier_data.setdefault("created_at", now_iso)
         supplier_data.setdefault("updated_at", now_iso)
 
         try:
-            result = self.supplier.insert_one(supplier_data)
-            return result.inserted_id
+            await self.supplier.insert_one(supplier_data)
+            self.directory_cache.invalidate()
+            return supplier_data
         except DuplicateKeyError:
             raise ValueError(f"Supplier '{supplier_data.get('code')}' đã tồn tại")
 
-    def get_supplier_by_name(self, name: str) -> Optional[Dict]:
+    async def get_supplier_by_name(self, name: str) -> Optional[Dict]:
         """Lấy supplier theo tên"""
-        return self.supplier.find_one({"name": name})
+        return await self.supplier.find_one({"name": name})
 
-    def get_supplier_by_code(self, code: str) -> Optional[Dict]:
+    async def get_supplier_by_code(self, code: str) -> Optional[Dict]:
         """Lấy supplier theo code"""
-        return self.supplier.find_one({"code": code})
+        return await self.supplier.find_one({"code": code})
 
-    def get_supplier_by_object_id(self, object_id) -> Optional[Dict]:
+    async def get_existing_codes(self, codes) -> Set[str]:
+        """Lấy tập code của các supplier tồn tại trong `codes` (tra trong danh bạ).
+
+        Code không có trong danh bạ được kiểm tra lại trên Mongo bằng một truy vấn $in.
+        """
+        codes = set(codes)
+        by_code, _ = await self._get_directory()
+        existing = {code for code in codes if code in by_code}
+        missing = codes - existing
+        if missing:
+            found = {
+                supplier["code"]
+                async for supplier in self.supplier.find({"code": {"$in": list(missing)}}, {"code": 1})
+            }
+            if found:
+                self.directory_cache.invalidate()
+            existing |= found
+        return existing
+
+    async def get_cached_supplier_by_code(self, code: str) -> Optional[Dict]:
+        """Như get_supplier_by_code nhưng tra trong danh bạ trước, chỉ truy vấn Mongo khi không thấy"""
+        by_code, _ = await self._get_directory()
+        supplier = by_code.get(code)
+        if supplier is None:
+            supplier = await self._find_missing({"code": code})
+        return dict(supplier) if supplier else None
+
+    async def get_cached_supplier_by_name(self, name: str) -> Optional[Dict]:
+        """Như get_supplier_by_name nhưng tra trong danh bạ trước, chỉ truy vấn Mongo khi không thấy"""
+        _, by_name = await self._get_directory()
+        supplier = by_name.get(name)
+        if supplier is None:
+            supplier = await self._find_missing({"name": name})
+        return dict(supplier) if supplier else None
+
+    async def _find_missing(self, query: Dict) -> Optional[Dict]:
+        """Tra Mongo khi danh bạ không có: supplier có thể vừa được tạo ở worker khác.
+
+        Danh bạ là cache riêng của từng worker, nên thiếu trong danh bạ không có
+        nghĩa là không tồn tại. Tìm thấy thì bỏ danh bạ để lần sau nạp lại.
+        """
+        supplier = await self.supplier.find_one(query)
+        if supplier is not None:
+            self.directory_cache.invalidate()
+        return supplier
+
+    async def _get_directory(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """Danh bạ supplier dạng (theo code, theo name).
+
+        Nạp toàn bộ collection bằng một truy vấn khi cache trống/hết hạn. Thao tác
+        ghi chỉ invalidate danh bạ của worker thực hiện; worker khác thấy supplier
+        mới ngay nhờ _find_missing, còn thay đổi/xóa thì sau tối đa SUPPLIER_CACHE_TTL.
+        """
+        directory = self.directory_cache.get("directory")
+        if directory is not None:
+            return directory
+        generation = self.directory_cache.generation
+        by_code: Dict[str, Dict] = {}
+        by_name: Dict[str, Dict] = {}
+        async for supplier in self.supplier.find():
+            by_code[supplier["code"]] = supplier
+            # Tên không unique: giữ supplier đầu tiên giống find_one
+            by_name.setdefault(supplier.get("name"), supplier)
+        directory = (by_code, by_name)
+        self.directory_cache.set("directory", directory, generation)
+        return directory
+
+    async def get_supplier_by_object_id(self, object_id) -> Optional[Dict]:
         """Lấy supplier theo MongoDB ObjectId"""
-        return self.supplier.find_one({"_id": ObjectId(object_id)})
+        return await self.supplier.find_one({"_id": ObjectId(object_id)})
+
+    async def get_suppliers_by_filter(
+        self,
+        filter,
+        projection: Optional[Dict] = None,
+        predicates: Optional[Dict] = None,
+    )->Tuple[List[Dict], Optional[str]]:
+        """
+        Lấy suppliers theo filter, phân trang theo cursor `after` (sắp xếp theo tên)
 
-    def get_suppliers_by_filter(self,filter)->List[Dict]:
+        Args:
+            filter: Điều kiện tìm kiếm và phân trang (after, num)
+            projection: Các trường view cần lấy
+            predicates: Điều kiện bắt buộc của view, kết hợp AND với filter
+        """
         query: Dict = {
             k: v 
             for k, v in (filter or {}).items()
-            if v not in (None, "") and k not in ("start", "num")
+            if v not in (None, "") and k not in ("after", "num")
         }
-        cursor = self.supplier.find(query)
-        start = filter.get("start")
-        num = filter.get("num")
-        # lấy num sản phẩm tính từ start
-        if start is not None and num is not None:
-            start = max(start, 0)
-            num = max(num, 1)
-            cursor = cursor.skip(start).limit(num)
-        return list(cursor)
-
-
-    def get_all_suppliers(self) -> List[Dict]:
+        if predicates:
+            query = {"$and": [query, predicates]} if query else dict(predicates)
+        return await find_page(
+            self.supplier, query, "name", ASCENDING,
+            after=filter.get("after"), num=filter.get("num"), projection=projection,
+        )
+
+
+    async def get_all_suppliers(self) -> List[Dict]:
         """Lấy tất cả suppliers"""
-        return list(self.supplier.find())
+        return await self.supplier.find().to_list()
 
-    def update_supplier(self, code: str, update_data: Dict) -> bool:
+    async def update_supplier(self, code: str, update_data: Dict) -> bool:
         """
         Cập nhật thông tin supplier
         
@@ -97,24 +183,76 @@ class SupplierRepository:
 
         update_data["updated_at"] = datetime.now().isoformat()
 
-        result = self.supplier.update_one(
+        result = await self.supplier.update_one(
             {"code": code},
             {"$set": update_data}
         )
+        if result.modified_count:
+            self.directory_cache.invalidate()
         return result.modified_count > 0
 
-    def delete_supplier(self, code: str) -> bool:
+    async def find_and_update_supplier(
+        self, object_id, update_data: Dict, expected: Optional[Dict] = None, validated: bool = False
+    ) -> Optional[Dict]:
+        """
+        Cập nhật nguyên tử supplier theo ObjectId và trả về bản sau cập nhật (một round trip)
+
+        Args:
+            object_id: MongoDB ObjectId của supplier
+            update_data: Dữ liệu cần cập nhật
+            expected: Điều kiện thêm phải thỏa tại thời điểm ghi (VD: {"status": "active"})
+            validated: True nếu caller đã validate theo update_supplier_schema
+
+        Returns:
+            Supplier sau cập nhật, hoặc None nếu không có supplier nào khớp
+
+        Raises:
+            ValidationError: Nếu dữ liệu không hợp lệ
+        """
+        if not validated:
+            validate_data(update_data, update_supplier_schema)
+
+        update_data["updated_at"] = datetime.now().isoformat()
+
+        supplier = await self.supplier.find_one_and_update(
+            {**(expected or {}), "_id": ObjectId(object_id)},
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER,
+        )
+        if supplier:
+            self.directory_cache.invalidate()
+        return supplier
+
+    async def set_supplier_status(self, object_id, status: str) -> Tuple[Optional[Dict], bool]:
+        """
+        Chuyển status của supplier, chỉ ghi khi status hiện tại khác `status`
+
+        Returns:
+            Tuple[Optional[Dict], bool]: (supplier, changed) - supplier sau cập nhật và True
+            nếu đã chuyển; supplier hiện tại và False nếu đã ở sẵn `status`;
+            (None, False) nếu không tồn tại
+        """
+        supplier = await self.find_and_update_supplier(
+            object_id, {"status": status}, {"status": {"$ne": status}}
+        )
+        if supplier:
+            return supplier, True
+        return await self.get_supplier_by_object_id(object_id), False
+
+    async def delete_supplier(self, code: str) -> bool:
         """Xóa supplier"""
-        supplier = self.get_supplier_by_code(code)
+        supplier = await self.get_supplier_by_code(code)
         if not supplier:
             raise ValueError(f"Supplier với mã '{code}' không tồn tại")
         elif supplier.get("status") == "active":
             raise ValueError(f"Không thể xóa supplier đang hoạt động")
-        result = self.supplier.delete_one({"code": code})
+        result = await self.supplier.delete_one({"code": code})
+        if result.deleted_count:
+            self.directory_cache.invalidate()
         return result.deleted_count > 0
 
 
-    def end_supply(self, code: str, end_date: datetime = None) -> bool:
+    async def end_supply(self, code: str, end_date: datetime = None) -> bool:
         """
         Kết thúc cung cấp với supplier
         
@@ -128,16 +266,19 @@ class SupplierRepository:
         if end_date is None:
             end_date = datetime.now()
         
-        result = self.supplier.update_one(
+        result = await self.supplier.update_one(
             {"code": code},
             {"$set": {
             "supply_end_date": end_date,
-            "status": "inactive"
+            "status": "inactive",
+            "updated_at": datetime.now().isoformat()
         }}
         )
+        if result.modified_count:
+            self.directory_cache.invalidate()
         return result.modified_count > 0
 
-    def is_supplier_exist(self, supplier_code: str) -> Tuple[bool, Dict, int]:
+    async def is_supplier_exist(self, supplier_code: str) -> Tuple[bool, Dict, int]:
         """Kiểm tra sự tồn tại của supplier theo code.
 
         Returns:
@@ -149,7 +290,7 @@ class SupplierRepository:
         if not supplier_code:
             return False, {"error": "supplier_id là bắt buộc"}, 400
 
-        supplier = self.get_supplier_by_code(supplier_code)
+        supplier = await self.get_cached_supplier_by_code(supplier_code)
         if not supplier:
             return False, {"error": "id nhà cung cấp không tồn tại, hãy tạo nhà cung cấp trước"}, 400
 
@@ -1,43 +1,49 @@
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING
 from passlib.hash import bcrypt
+from config import Config
 from backend.databases.mongodb import MongoDB
 from backend.constants.mongodb_constants import MongoCollections
 from pymongo.errors import DuplicateKeyError
+from backend.utils.pagination import find_page
 from backend.utils.validation import validate_data
 from backend.models.user import create_user_schema
 class UserRepository:
     def __init__(self, db: MongoDB):
         self.user = db.get_collection(MongoCollections.user)
-        self._ensure_indexes()
-    def _ensure_indexes(self):
+    async def _ensure_indexes(self):
         try:
-            self.user.create_index("username", unique=True)
+            await self.user.create_index("username", unique=True)
         except Exception:
             pass
 
-    def insert_user(self, user_data):
-        validate_data(user_data, create_user_schema)
+    async def insert_user(self, user_data, validated: bool = False):
+        """Insert user; `validated=True` khi caller đã validate theo create_user_schema."""
+        if not validated:
+            validate_data(user_data, create_user_schema)
         try:
-            return self.user.insert_one(user_data)
+            return await self.user.insert_one(user_data)
         except DuplicateKeyError:
             raise ValueError("Username already exists")
 
-    def get_user_by_username(self, username: str):
-        return self.user.find_one({"username": username})
-    def get_user_by_filter(self, filter: Dict)->list[Dict]:
-         # Xây dựng điều kiện lọc từ dict; bỏ qua key None/"" và bỏ cả các trường start/end
-        query: Dict = {
+    async def get_user_by_username(self, username: str):
+        return await self.user.find_one({"username": username})
+    async def get_user_by_filter(self, filter: Dict, projection: Optional[Dict] = None)->Tuple[List[Dict], Optional[str]]:
+        # username là unique: chỉ sort/keyset theo username để index {username: 1}
+        # phục vụ được, không cần thêm _id (sort (username, _id) sẽ phải sort trong bộ nhớ)
+        filter = filter or {}
+        return await find_page(
+            self.user, self._build_query(filter), "username", ASCENDING,
+            after=filter.get("after"), num=filter.get("num"), projection=projection, unique=True,
+        )
+    def export_cursor(self, filter: Dict, projection: Optional[Dict] = None):
+        """Cursor không phân trang cho export, Mongo trả về theo từng batch EXPORT_BATCH_SIZE."""
+        query = self._build_query(filter or {})
+        return self.user.find(query, projection).sort("username", ASCENDING).batch_size(Config.EXPORT_BATCH_SIZE)
+    def _build_query(self, filter: Dict) -> Dict:
+        # Xây dựng điều kiện lọc từ dict; bỏ qua key None/"" và bỏ cả các trường phân trang
+        return {
             k: v
-            for k, v in (filter or {}).items()
-            if v not in (None, "") and k not in ("start", "num")
+            for k, v in filter.items()
+            if v not in (None, "") and k not in ("after", "num")
         }
-
-        cursor = self.user.find(query)
-        start = filter.get("start")
-        num = filter.get("num")
-        # lấy num sản phẩm tính từ start
-        if start is not None and num is not None:
-            start = max(start, 1)
-            num = max(num, 1)
-            cursor = cursor.skip(start-1).limit(num)
-        return list(cursor)
\ No newline at end of file
@@ -1,14 +1,6 @@
-# Helper function
 from backend.constants.order_filter import Order_filter
 
 
-def _serialize_order(order):
-    """Serialize order ObjectId to string."""
-    if order and "_id" in order:
-        order["_id"] = str(order["_id"])
-    return order
-
-
 def get_order_filter_request(request):
     """Lấy filter từ request query parameters."""
     order_id = request.args.get("order_id")
@@ -17,12 +9,8 @@ def get_order_filter_request(request):
     payment_status = request.args.get("payment_status")
     order_status = request.args.get("order_status")
     
-    # Xử lý start/num an toàn
-    try:
-        start = int(request.args.get("start"))
-    except (TypeError, ValueError):
-        start = -1
-    
+    # Phân trang: cursor `after` (next_cursor của trang trước) + số lượng num
+    after = request.args.get("after")
     try:
         num = int(request.args.get("num"))
     except (TypeError, ValueError):
@@ -36,7 +24,7 @@ def get_order_filter_request(request):
         payment_status=payment_status,
         order_status=order_status,
         note=None,
-        start=start,
+        after=after,
         num=num
     )
     return filter_obj
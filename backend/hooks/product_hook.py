@@ -1,11 +1,43 @@
+import csv
+import json as jsonlib
+
 from backend.constants.product_filter import Product_filter
+from backend.utils.stream import iter_lines
 from backend.utils.validation import validate_data
 from backend.models.product import create_product_schema
 from jsonschema import ValidationError
 from sanic import json
 
 
-def is_product_not_duplicate(product_repo, product_code):
+async def resolve_supplier_filter(supplier_repo, filter_obj):
+    """
+    Filter theo supplier (id hoặc name): đối chiếu nhà cung cấp và điền đủ cả
+    supplier_id lẫn supplier_name vào filter_obj (query chỉ lọc theo supplier_id)
+
+    Returns:
+        tuple: (is_valid, error_response or None)
+    """
+    if not (filter_obj.supplier_id or filter_obj.supplier_name):
+        return True, None
+
+    if filter_obj.supplier_id:
+        is_exist, supplier_payload, status = await supplier_repo.is_supplier_exist(
+            filter_obj.supplier_id
+        )
+        if not is_exist:
+            return False, json(supplier_payload, status=status)
+        supplier_doc = supplier_payload
+    else:
+        supplier_doc = await supplier_repo.get_cached_supplier_by_name(filter_obj.supplier_name)
+        if not supplier_doc:
+            return False, json({"error": "Nhà cung cấp không tồn tại"}, status=400)
+
+    filter_obj.supplier_name = supplier_doc.get("name")
+    filter_obj.supplier_id = supplier_doc.get("code")
+    return True, None
+
+
+async def is_product_not_duplicate(product_repo, product_code):
     """
     Kiểm tra sản phẩm chưa tồn tại trong hệ thống
     
@@ -15,13 +47,21 @@ def is_product_not_duplicate(product_repo, product_code):
     if not product_code:
         return False, json({"error": "code là bắt buộc"}, status=400)
     
-    existing_product = product_repo.get_product_by_code(product_code)
+    existing_product = await product_repo.get_product_by_code(product_code)
     if existing_product:
         return False, json({"error": "sản phẩm đã được tạo trước đấy rồi"}, status=400)
     
     return True, None
 
 
+def _get_number_arg(request, name, cast):
+    """Đọc query param dạng số; trả None nếu thiếu hoặc sai định dạng."""
+    try:
+        return cast(request.args.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
 def get_filter_request(request):
     product_name = request.args.get("name")
     product_code = request.args.get("product_code")
@@ -29,13 +69,15 @@ def get_filter_request(request):
     supplier_name = request.args.get("supplier_name")
     supplier_id = request.args.get("supplier_code")
     status = request.args.get("status")
+    q = request.args.get("q")
+    sort = request.args.get("sort")
+    min_price = _get_number_arg(request, "min_price", float)
+    max_price = _get_number_arg(request, "max_price", float)
+    min_quantity = _get_number_arg(request, "min_quantity", int)
+    max_quantity = _get_number_arg(request, "max_quantity", int)
     
-    # Xử lý start/end an toàn
-    try:
-        start = int(request.args.get("start"))
-    except (TypeError, ValueError):
-        start = -1
-    
+    # Phân trang: cursor `after` (next_cursor của trang trước) + số lượng num
+    after = request.args.get("after")
     try:
         num = int(request.args.get("num"))
     except (TypeError, ValueError):
@@ -48,9 +90,78 @@ def get_filter_request(request):
         supplier_name=supplier_name,
         supplier_id=supplier_id,
         status=status,
-        start=start,
+        q=q,
+        min_price=min_price,
+        max_price=max_price,
+        min_quantity=min_quantity,
+        max_quantity=max_quantity,
+        sort=sort,
+        after=after,
         num=num
     )
     return filter_obj
 
-    
\ No newline at end of file
+
+# Các cột số khi import CSV (CSV chỉ có chuỗi)
+IMPORT_NUMBER_FIELDS = {"sell_price": float, "import_price": float, "total_quantity": int}
+
+
+def get_import_format(request):
+    """Xác định định dạng body import: ?format=ndjson|csv hoặc theo Content-Type."""
+    fmt = request.args.get("format")
+    if not fmt:
+        content_type = request.headers.get("Content-Type", "")
+        if "csv" in content_type:
+            fmt = "csv"
+        elif "ndjson" in content_type or "jsonl" in content_type:
+            fmt = "ndjson"
+    return fmt if fmt in ("ndjson", "csv") else None
+
+
+async def iter_import_rows(request, fmt):
+    """Đọc từng dòng sản phẩm từ body dạng stream.
+
+    CSV: dòng đầu là header (tên trường), ô rỗng bị bỏ qua; không hỗ trợ xuống
+    dòng bên trong ô.
+
+    Yields:
+        tuple: (số thứ tự dòng, dict sản phẩm hoặc None, thông báo lỗi hoặc None)
+    """
+    header = None
+    line_number = 0
+    async for raw in iter_lines(request.stream):
+        line_number += 1
+        line = raw.decode("utf-8", errors="replace").strip()
+        if line_number == 1:
+            line = line.lstrip("\ufeff")
+        if not line:
+            continue
+
+        if fmt == "ndjson":
+            try:
+                row = jsonlib.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"JSON không hợp lệ: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "Mỗi dòng phải là một object JSON"
+                continue
+            yield line_number, row, None
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield line_number, None, f"Số cột ({len(values)}) không khớp header ({len(header)})"
+            continue
+        row = {name: value for name, value in zip(header, values) if value != ""}
+        try:
+            for field, cast in IMPORT_NUMBER_FIELDS.items():
+                if field in row:
+                    row[field] = cast(row[field])
+        except ValueError:
+            yield line_number, None, f"Trường '{field}' phải là số"
+            continue
+        yield line_number, row, None
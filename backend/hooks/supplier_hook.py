@@ -9,11 +9,8 @@ def get_filter_request(request):
     email = request.args.get("email")
     status = request.args.get("status")
 
-    try:
-        start = int(request.args.get("start"))
-    except (TypeError, ValueError):
-        start = -1
-
+    # Phân trang: cursor `after` (next_cursor của trang trước) + số lượng num
+    after = request.args.get("after")
     try:
         num = int(request.args.get("num"))
     except (TypeError, ValueError):
@@ -26,7 +23,7 @@ def get_filter_request(request):
         phone=phone,
         email=email,
         status=status,
-        start=start,
+        after=after,
         num=num,
     )
     return filter_obj
\ No newline at end of file
@@ -4,12 +4,8 @@ def get_filter_request(request):
     email = request.args.get("email")
     status = request.args.get("status")
     role = request.args.get("role")
-    # Xử lý start/end an toàn
-    try:
-        start = int(request.args.get("start"))
-    except (TypeError, ValueError):
-        start = -1
-    
+    # Phân trang: cursor `after` (next_cursor của trang trước) + số lượng num
+    after = request.args.get("after")
     try:
         num = int(request.args.get("num"))
     except (TypeError, ValueError):
@@ -20,7 +16,7 @@ def get_filter_request(request):
         email=email,
         status=status,
         role=role,
-        start=start,
+        after=after,
         num=num
     )
     return filter_obj
\ No newline at end of file
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run_order_archiver(order_repo) -> None:
+    """Task nền: mỗi ORDER_ARCHIVE_INTERVAL_SECONDS giây chuyển đơn đã kết thúc sang order_archive.
+
+    Lỗi của một lượt chỉ được log, lượt sau chạy lại (archive_orders an toàn khi chạy lại).
+    """
+    while True:
+        try:
+            moved = await order_repo.archive_orders()
+            if moved:
+                logger.info("Archived %d orders", moved)
+        except Exception:
+            logger.exception("Error archive orders")
+        await asyncio.sleep(Config.ORDER_ARCHIVE_INTERVAL_SECONDS)
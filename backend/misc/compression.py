@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli là dependency tùy chọn
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard là dependency tùy chọn
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+# Thứ tự ưu tiên khi client chấp nhận nhiều encoding với cùng q
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda body: zstandard.ZstdCompressor(level=3).compress(body)
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+ENCODERS["gzip"] = _gzip
+
+
+class CompressionStats:
+    """Số liệu nén response theo encoding trong worker hiện tại."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict] = {}
+
+    def record(self, encoding: str, size_in: int, size_out: int, cpu_seconds: float, offloaded: bool) -> None:
+        entry = self._data.setdefault(encoding, {
+            "responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "offloaded": 0,
+        })
+        entry["responses"] += 1
+        entry["bytes_in"] += size_in
+        entry["bytes_out"] += size_out
+        entry["cpu_seconds"] += cpu_seconds
+        entry["offloaded"] += int(offloaded)
+
+    def stats(self) -> Dict:
+        return {
+            encoding: {
+                **entry,
+                "cpu_seconds": round(entry["cpu_seconds"], 6),
+                "ratio": round(entry["bytes_out"] / entry["bytes_in"], 4) if entry["bytes_in"] else 0.0,
+            }
+            for encoding, entry in self._data.items()
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Chọn encoding tốt nhất trong ENCODERS theo header Accept-Encoding (có xét q)."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compress(encoding: str, body: bytes) -> Tuple[bytes, float]:
+    """Nén body, trả về kèm CPU time của thread thực hiện."""
+    started = time.thread_time()
+    compressed = ENCODERS[encoding](body)
+    return compressed, time.thread_time() - started
+
+
+async def compress_response(request, response):
+    """Response middleware: nén body lớn hơn COMPRESSION_MIN_SIZE theo Accept-Encoding.
+
+    Body từ COMPRESSION_OFFLOAD_SIZE trở lên được nén trong thread pool để không
+    chặn event loop. Response stream (export) và response đã có Content-Encoding
+    được giữ nguyên.
+    """
+    body = getattr(response, "body", None)
+    if not body or len(body) < Config.COMPRESSION_MIN_SIZE:
+        return
+    if response.status < 200 or response.status in (204, 206, 304):
+        return
+    if "Content-Encoding" in response.headers:
+        return
+    content_type = response.content_type or ""
+    if not content_type.startswith(COMPRESSIBLE_TYPES):
+        return
+
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return
+
+    offloaded = len(body) >= Config.COMPRESSION_OFFLOAD_SIZE
+    if offloaded:
+        compressed, cpu_seconds = await asyncio.to_thread(_compress, encoding, body)
+    else:
+        compressed, cpu_seconds = _compress(encoding, body)
+    compression_stats.record(encoding, len(body), len(compressed), cpu_seconds, offloaded)
+
+    response.body = compressed
+    response.headers["Content-Encoding"] = encoding
+    vary = response.headers.get("Vary")
+    response.headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    # Bản nén khác từng byte với bản gốc nên ETag chỉ còn là weak validator
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        response.headers["ETag"] = f"W/{etag}"
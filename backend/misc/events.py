@@ -0,0 +1,110 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from config import Config
+from backend.utils.serialization import dumps
+
+
+# Gửi khi subscriber bị tràn queue: client tải lại dữ liệu một lần thay vì nhận tiếp event cũ
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+def format_event(event_id: int, event: str, data: Dict) -> bytes:
+    """Một frame SSE; orjson không sinh xuống dòng nên data luôn nằm trên một dòng."""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), dumps(data))
+
+
+class Subscription:
+    """Một client đang nghe bus, với queue giới hạn EVENTS_QUEUE_SIZE frame.
+
+    Publisher không bao giờ chờ subscriber: queue đầy (client đọc chậm hơn tốc độ
+    event) thì bỏ toàn bộ frame đang chờ và thay bằng một frame resync.
+    """
+
+    def __init__(self, bus: "EventBus", topics: Optional[Set[str]], maxsize: int):
+        self._bus = bus
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def wants(self, topic: str) -> bool:
+        return self.topics is None or topic in self.topics
+
+    def offer(self, frame: bytes) -> bool:
+        """Đưa frame vào queue; False nếu queue đầy và đã chuyển sang resync."""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+            return False
+
+    async def get(self, timeout: float) -> bytes:
+        """Frame kế tiếp, hoặc heartbeat nếu không có event trong `timeout` giây."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return HEARTBEAT_FRAME
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """Pub/sub trong process cho thay đổi đơn hàng và tồn kho (mỗi worker một bus).
+
+    Event có dạng "<topic>.<hành động>" (VD: order.created, stock.changed).
+    publish chỉ encode event một lần rồi đưa cùng frame bytes vào queue của mọi
+    subscriber quan tâm topic đó, nên N tab admin chỉ tốn N stream chứ không
+    phải N lần truy vấn. Không có subscriber thì publish không làm gì.
+    Chỉ gọi trên event loop của worker (không có lock).
+
+    Bus nằm trong bộ nhớ của từng worker, không chia sẻ giữa các process:
+    client đang nối vào worker A không bao giờ thấy thay đổi do worker B xử lý.
+    Chạy nhiều worker thì client chỉ nhận được một phần event và vẫn cần tải
+    lại định kỳ (hoặc khi nhận resync) để không bỏ sót.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self._last_id = 0
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, maxsize: int = Config.EVENTS_QUEUE_SIZE) -> Subscription:
+        subscription = Subscription(self, set(topics) if topics else None, maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: Dict) -> None:
+        topic = event.split(".", 1)[0]
+        subscribers = [s for s in self._subscribers if s.wants(topic)]
+        if not subscribers:
+            return
+        self._last_id += 1
+        self.published += 1
+        frame = format_event(self._last_id, event, data)
+        for subscription in subscribers:
+            if not subscription.offer(frame):
+                self.overflows += 1
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+            "queued": sum(s.queue.qsize() for s in self._subscribers),
+        }
+
+
+event_bus = EventBus()
@@ -0,0 +1,8 @@
+from backend.models import cart, order, product, supplier, user
+from backend.utils.validation import get_validator
+
+# Compile validator cho mọi *_schema một lần khi import, thay vì ở request đầu tiên
+for _module in (cart, order, product, supplier, user):
+    for _name, _schema in vars(_module).items():
+        if _name.endswith("_schema") and isinstance(_schema, dict):
+            get_validator(_schema)
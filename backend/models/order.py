@@ -59,6 +59,9 @@ create_order_schema = {
                     "name": {"type": "string"},
                     "price": {"type": "number", "minimum": 0},
                     "quantity": {"type": "integer", "minimum": 1},
+                    # Bản chụp lúc đặt hàng, dùng cho rollup doanh số / lợi nhuận
+                    "category": {"type": "string"},
+                    "import_price": {"type": "number", "minimum": 0},
                 },
                 "required": ["product_id", "name", "price", "quantity"]
             }
@@ -129,7 +129,13 @@ filter_product_schema = {
         "supplier_name": {"type": "string"},
         "product_name": {"type": "string"},
         "name": {"type": "string"},
-        "start": {"type": "integer", "minimum": 0},
+        "q": {"type": "string"},
+        "min_price": {"type": "number", "minimum": 0},
+        "max_price": {"type": "number", "minimum": 0},
+        "min_quantity": {"type": "integer", "minimum": 0},
+        "max_quantity": {"type": "integer", "minimum": 0},
+        "sort": {"type": "string", "enum": ["price", "-price", "newest", "name"]},
+        "after": {"type": "string"},
         "num": {"type": "integer", "minimum": 1},
     },
     "additionalProperties": False
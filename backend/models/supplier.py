@@ -97,7 +97,7 @@ filter_supplier_schema = {
         "email": {"type": "string", "format": "email"},
         "address": {"type": "string", "minLength": 1},
         "status": {"type": "string", "enum": ["active", "inactive"]},
-        "start": {"type": "integer", "minimum": 1},
+        "after": {"type": "string"},
         "num": {"type": "integer", "minimum": 1},
     },
     "additionalProperties": False,
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """LRU cache giới hạn số phần tử, mỗi phần tử hết hạn sau `ttl` giây.
+
+    Cache nằm trong bộ nhớ của một worker và chỉ được dùng trên event loop
+    (không cần lock). `generation` tăng mỗi lần invalidate để caller biết kết
+    quả đọc từ DB có còn hợp lệ để ghi vào cache hay không.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Lấy giá trị còn hạn theo key, cập nhật bộ đếm hit/miss."""
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, generation: int = None) -> None:
+        """Ghi giá trị vào cache.
+
+        Nếu truyền `generation` (lấy trước khi đọc DB) mà cache đã bị invalidate
+        trong lúc đó thì bỏ qua, tránh ghi lại dữ liệu cũ.
+        """
+        if generation is not None and generation != self.generation:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Xóa toàn bộ cache."""
+        self._data.clear()
+        self.generation += 1
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
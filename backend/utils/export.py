@@ -0,0 +1,64 @@
+import csv
+import io
+from typing import Dict, List
+
+from config import Config
+from backend.utils.serialization import dumps
+
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def get_export_format(request):
+    """Định dạng export từ ?format=ndjson|csv (mặc định ndjson); None nếu không hợp lệ."""
+    fmt = request.args.get("format", "ndjson")
+    return fmt if fmt in EXPORT_CONTENT_TYPES else None
+
+
+def export_projection(columns: List[str]) -> Dict:
+    """Projection chỉ lấy các cột sẽ export, để Mongo không gửi về trường thừa."""
+    return {**{column: 1 for column in columns}, "_id": 0}
+
+
+def _csv_value(value):
+    """Ô CSV: giữ nguyên giá trị đơn, encode JSON cho object/array (VD: items của order)."""
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    return "" if value is None else value
+
+
+async def stream_export(request, cursor, fmt: str, columns: List[str], filename: str):
+    """Stream kết quả của Mongo cursor về client dưới dạng NDJSON hoặc CSV.
+
+    Mỗi lần chỉ giữ tối đa EXPORT_BATCH_SIZE dòng đã serialize trong bộ nhớ rồi
+    gửi đi, nên bộ nhớ không phụ thuộc vào tổng số document.
+    """
+    response = await request.respond(
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+
+    pending = 0
+    async for document in cursor:
+        if writer:
+            writer.writerow([_csv_value(document.get(column)) for column in columns])
+        else:
+            row = {column: document.get(column) for column in columns}
+            buffer.write(dumps(row).decode())
+            buffer.write("\n")
+        pending += 1
+        if pending >= Config.EXPORT_BATCH_SIZE:
+            await response.send(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    await response.send(buffer.getvalue())
+    await response.eof()
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+from backend.constants.enum import User_Role
+
+
+def compute_etag(role: str, filter: Dict, documents: List[Dict]) -> str:
+    """Tính strong ETag cho một trang danh sách.
+
+    Chỉ băm role, filter, số document và cặp (_id, updated_at) của từng document
+    nên rẻ hơn nhiều so với serialize cả body. Mọi thao tác ghi đều cập nhật
+    `updated_at` nên khi nội dung đổi thì ETag đổi theo.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((
+        role,
+        sorted((k, v) for k, v in (filter or {}).items() if v not in (None, "")),
+        len(documents),
+    )).encode())
+    for document in documents:
+        digest.update(f"|{document.get('_id')}:{document.get('updated_at')}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def last_modified(documents: Iterable[Dict]) -> Optional[str]:
+    """Giá trị header Last-Modified: updated_at lớn nhất của trang (HTTP-date)."""
+    latest = max((d.get("updated_at") for d in documents if d.get("updated_at")), default=None)
+    if latest is None:
+        return None
+    if isinstance(latest, str):
+        try:
+            latest = datetime.fromisoformat(latest)
+        except ValueError:
+            return None
+    # updated_at được lưu theo giờ local không kèm timezone
+    return format_datetime(latest.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request, etag: str) -> bool:
+    """True nếu If-None-Match của client khớp với ETag hiện tại."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # So sánh weak theo RFC 9110: bỏ tiền tố W/ khi đối chiếu
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def cache_headers(role: str, etag: str, documents: Iterable[Dict]) -> Dict[str, str]:
+    """Header cache cho response danh sách, khác nhau theo role.
+
+    Guest không gửi token nên cho phép cache public trong thời gian ngắn;
+    user/admin phải revalidate mỗi lần (rẻ nhờ 304).
+    """
+    if role == User_Role.GUEST:
+        cache_control = f"public, max-age={Config.PUBLIC_CACHE_MAX_AGE}"
+    else:
+        cache_control = "private, no-cache"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Authorization",
+    }
+    modified = last_modified(documents)
+    if modified:
+        headers["Last-Modified"] = modified
+    return headers
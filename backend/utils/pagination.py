@@ -0,0 +1,90 @@
+import base64
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+
+def encode_cursor(document: Dict, sort_key: str) -> str:
+    """Mã hóa (sort_key, _id) của document cuối trang thành token `after`."""
+    raw = json_util.dumps([document.get(sort_key), document["_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[object, ObjectId]:
+    """Giải mã token `after`.
+
+    Raises:
+        ValueError: Nếu token không hợp lệ
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Cursor phân trang không hợp lệ")
+    if not isinstance(last_id, ObjectId):
+        raise ValueError("Cursor phân trang không hợp lệ")
+    return value, last_id
+
+
+def keyset_query(
+    query: Dict, sort_key: str, direction: int, after: Optional[str], unique: bool = False
+) -> Dict:
+    """Thêm điều kiện "sau cursor" vào query, theo thứ tự (sort_key, _id).
+
+    `unique=True` khi sort_key là unique (VD: order_id): chỉ cần so sánh sort_key.
+    """
+    if not after:
+        return query
+    value, last_id = decode_cursor(after)
+    op = "$gt" if direction == 1 else "$lt"
+    if unique:
+        predicate = {sort_key: {op: value}}
+    else:
+        predicate = {
+            "$or": [
+                {sort_key: {op: value}},
+                {sort_key: value, "_id": {op: last_id}},
+            ]
+        }
+    return {"$and": [query, predicate]} if query else predicate
+
+
+async def find_page(
+    collection,
+    query: Dict,
+    sort_key: str,
+    direction: int,
+    after: Optional[str] = None,
+    num: Optional[int] = None,
+    projection: Optional[Dict] = None,
+    unique: bool = False,
+) -> Tuple[List[Dict], Optional[str]]:
+    """Lấy một trang theo keyset pagination.
+
+    Sắp xếp theo (sort_key, _id) để khớp với compound index tương ứng, nên trang
+    sâu tốn chi phí như trang đầu. Lấy dư một document để biết còn trang sau không.
+
+    Projection dạng chọn trường (inclusion) luôn được bổ sung sort_key và _id
+    vì cần chúng để sinh cursor. Với sort_key unique (`unique=True`) chỉ sắp
+    xếp theo sort_key, nên index đơn trên sort_key là đủ.
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: danh sách document và `next_cursor`
+        (None nếu đã hết dữ liệu hoặc không phân trang).
+    """
+    if projection and any(v for k, v in projection.items() if k != "_id"):
+        projection = {**projection, sort_key: 1, "_id": 1}
+    cursor = collection.find(keyset_query(query, sort_key, direction, after, unique), projection)
+    if unique:
+        cursor = cursor.sort(sort_key, direction)
+    else:
+        cursor = cursor.sort([(sort_key, direction), ("_id", direction)])
+    if num is None:
+        return await cursor.to_list(), None
+
+    num = max(num, 1)
+    documents = await cursor.limit(num + 1).to_list()
+    if len(documents) <= num:
+        return documents, None
+    documents = documents[:num]
+    return documents, encode_cursor(documents[-1], sort_key)
@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+import orjson
+from bson import Decimal128, ObjectId
+
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Kiểu orjson không tự encode được: ObjectId -> str, Decimal/Decimal128 -> số."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(obj, **kwargs) -> bytes:
+    """JSON encoder dùng chung cho mọi response (truyền vào Sanic(dumps=...)).
+
+    orjson encode trực tiếp document Mongo trong một lượt: datetime ra ISO 8601,
+    ObjectId/Decimal qua `_default`, nên handler không cần copy hay sửa document
+    trước khi trả về. Các kwargs kiểu json.dumps (VD: ensure_ascii) bị bỏ qua,
+    orjson luôn xuất UTF-8.
+    """
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
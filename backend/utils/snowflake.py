@@ -0,0 +1,66 @@
+import os
+import re
+import time
+
+from config import Config
+
+
+TIMESTAMP_BITS = 41
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# Số worker tối đa trên một node: WORKER_BITS chia thành 5 bit node + 5 bit worker
+WORKERS_PER_NODE = 32
+
+
+class SnowflakeGenerator:
+    """Sinh ID 64 bit tăng dần theo thời gian: | 41 bit ms | 10 bit worker | 12 bit sequence |.
+
+    Hai worker khác `worker_id` không bao giờ sinh trùng ID; trong một worker ID
+    luôn tăng (tối đa 4096 ID mỗi ms). Hết sequence trong một ms hoặc đồng hồ bị
+    lùi thì mượn ms kế tiếp thay vì chờ, nên next_id không bao giờ chặn event loop.
+    Không có lock: mỗi worker chỉ gọi trên event loop của nó.
+    """
+
+    def __init__(self, worker_id: int, epoch_ms: int = Config.SNOWFLAKE_EPOCH_MS):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id phải trong khoảng 0..{MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._worker_bits = worker_id << SEQUENCE_BITS
+        self._epoch_ms = epoch_ms
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        now_ms = time.time_ns() // 1_000_000 - self._epoch_ms
+        if now_ms > self._last_ms:
+            self._last_ms = now_ms
+            self._sequence = 0
+        else:
+            self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+            if self._sequence == 0:
+                self._last_ms += 1
+        return (self._last_ms << TIMESTAMP_SHIFT) | self._worker_bits | self._sequence
+
+
+def snowflake_floor(timestamp_ms: int, epoch_ms: int = Config.SNOWFLAKE_EPOCH_MS) -> int:
+    """ID nhỏ nhất có thể sinh tại `timestamp_ms` (ms Unix): mọi ID sinh trước đó đều nhỏ hơn."""
+    return max(timestamp_ms - epoch_ms, 0) << TIMESTAMP_SHIFT
+
+
+def current_worker_id() -> int:
+    """worker_id của process hiện tại: SNOWFLAKE_NODE_ID * 32 + số thứ tự worker Sanic.
+
+    Sanic đặt SANIC_WORKER_IDENTIFIER (VD: "Srv  1") cho từng worker; chạy ngoài
+    Sanic (seed, benchmark) thì số thứ tự là 0.
+    """
+    match = re.search(r"(\d+)\s*$", os.environ.get("SANIC_WORKER_IDENTIFIER", ""))
+    index = int(match.group(1)) if match else 0
+    if index >= WORKERS_PER_NODE:
+        raise ValueError(f"Mỗi node chỉ hỗ trợ tối đa {WORKERS_PER_NODE} worker")
+    if not 0 <= Config.SNOWFLAKE_NODE_ID < (MAX_WORKER_ID + 1) // WORKERS_PER_NODE:
+        raise ValueError("SNOWFLAKE_NODE_ID phải trong khoảng 0..31")
+    return Config.SNOWFLAKE_NODE_ID * WORKERS_PER_NODE + index
@@ -0,0 +1,19 @@
+from typing import AsyncIterator
+
+
+async def iter_lines(stream) -> AsyncIterator[bytes]:
+    """Đọc body stream của Sanic theo từng dòng (bytes, đã bỏ '\\n').
+
+    Chỉ giữ trong bộ nhớ phần dòng dở dang giữa hai chunk.
+    """
+    buffer = b""
+    while True:
+        chunk = await stream.read()
+        if chunk is None:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
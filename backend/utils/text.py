@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def fold_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường ("Cà phê Đà Lạt" -> "ca phe da lat")."""
+    # đ/Đ là chữ cái riêng, NFD không tách được thành d + dấu
+    text = unicodedata.normalize("NFD", text or "").replace("đ", "d").replace("Đ", "D")
+    return "".join(c for c in text if unicodedata.category(c) != "Mn").lower()
+
+
+def to_search_text(text: str) -> str:
+    """Chuẩn hóa text để đưa vào (hoặc tìm trên) text index: bỏ dấu, chỉ giữ chữ/số."""
+    return " ".join(_NON_WORD.split(fold_diacritics(text))).strip()
@@ -1,10 +1,21 @@
-from jsonschema import validate, ValidationError
+from typing import Dict, Optional, Tuple
+
+from jsonschema import ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+
+# id(schema) -> (schema, validator); giữ cả schema để id không bị tái sử dụng
+_VALIDATORS: Dict[int, Tuple[dict, object]] = {}
 
 
 def validate_data(data, schema):
     """
     Kiểm tra tính hợp lệ của dữ liệu theo schema
 
+    Dùng validator đã compile sẵn cho schema (xem get_validator) thay vì
+    jsonschema.validate, vốn kiểm tra lại schema và dựng validator mỗi lần gọi.
+
     Args:
         data: Dữ liệu cần kiểm tra
         schema: Schema để validate
@@ -12,8 +23,46 @@ def validate_data(data, schema):
     Raises:
         ValidationError: Nếu dữ liệu không hợp lệ
     """
-    try:
-        validate(instance=data, schema=schema)
-    except ValidationError as e:
-        raise ValidationError(f"Dữ liệu không hợp lệ: {e.message}")
+    error = get_validation_error(get_validator(schema), data)
+    if error:
+        raise ValidationError(error)
+
 
+def get_validator(schema):
+    """
+    Validator đã compile của schema, chỉ compile lần đầu gặp schema đó
+
+    Các schema trong backend/models được compile sẵn khi import package models.
+    """
+    entry = _VALIDATORS.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        entry = (schema, compile_schema(schema))
+        _VALIDATORS[id(schema)] = entry
+    return entry[1]
+
+
+def compile_schema(schema):
+    """
+    Kiểm tra schema và tạo validator một lần, để validate nhiều bản ghi
+    mà không phải dựng lại validator cho từng bản ghi
+
+    Args:
+        schema: Schema để validate
+
+    Returns:
+        Validator của jsonschema ứng với schema
+    """
+    validator_cls = validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+def get_validation_error(validator, data) -> Optional[str]:
+    """
+    Validate data bằng validator đã compile
+
+    Returns:
+        Thông báo lỗi tiêu biểu nhất, hoặc None nếu dữ liệu hợp lệ
+    """
+    error = best_match(validator.iter_errors(data))
+    return f"Dữ liệu không hợp lệ: {error.message}" if error else None
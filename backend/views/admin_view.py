@@ -1,25 +1,45 @@
-from bson import ObjectId
-
 __all__ = ["product_list_view","_serialize_product"]
 
-def _serialize_object(obj: dict) -> dict:
-    """Convert MongoDB ObjectId to string for JSON serialization."""
-    if isinstance(obj.get("_id"), ObjectId):
-        obj["_id"] = str(obj["_id"])
-    return obj
+# Admin xem toàn bộ trường của sản phẩm/nhà cung cấp, không có điều kiện bắt buộc
+# (trừ trường search nội bộ dùng cho text index)
+PRODUCT_LIST_PROJECTION = {"search": 0}
+PRODUCT_LIST_PREDICATES = None
+# Không bao giờ trả password về client
+USER_LIST_PROJECTION = {"password": 0}
+# Danh sách đơn hàng: như bản của user nhưng thêm user_id; items chỉ có ở trang chi tiết
+ORDER_LIST_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "user_id": 1,
+    "order_status": 1,
+    "payment_status": 1,
+    "payment_method": 1,
+    "price": 1,
+    "total_amount": 1,
+    "shipping_address": 1,
+    "note": 1,
+    "created_at": 1,
+    "item_count": {"$size": {"$ifNull": ["$items", []]}},
+}
+
+# Cột (theo thứ tự) của file export; NDJSON cũng chỉ gồm các trường này
+PRODUCT_EXPORT_COLUMNS = [
+    "code", "name", "category", "supplier_id", "sell_price", "import_price",
+    "total_quantity", "status", "description", "image_url", "created_at", "updated_at",
+]
+ORDER_EXPORT_COLUMNS = [
+    "order_id", "user_id", "order_status", "payment_status", "payment_method",
+    "price", "total_amount", "items", "shipping_address", "note", "created_at",
+]
+USER_EXPORT_COLUMNS = ["username", "role", "status"]
 
+# Document trả nguyên trạng: encoder chung (backend.utils.serialization) tự
+# xử lý ObjectId/datetime, không cần copy hay sửa từng document
 def product_list_view(products_data):
-    serialized_products = [_serialize_object(p) for p in products_data]
-    return {"products": serialized_products,"count": len(serialized_products)}
+    return {"products": products_data, "count": len(products_data)}
 
 def supplier_list_view(suppliers_data):
-    serialized_suppliers = []
-    for p in suppliers_data:
-        serialized_suppliers.append(_serialize_object(p))
-    return {"suppliers": serialized_suppliers, "count": len(serialized_suppliers)}
+    return {"suppliers": suppliers_data, "count": len(suppliers_data)}
 
 def user_list_view(users_data):
-    serialized_users = []
-    for u in users_data:
-        serialized_users.append(_serialize_object(u))
-    return {"users": serialized_users, "count": len(serialized_users)}
\ No newline at end of file
+    return {"users": users_data, "count": len(users_data)}
\ No newline at end of file
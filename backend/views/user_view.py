@@ -1,27 +1,70 @@
 from backend.constants.enum import Product_Status,Supplier_Status
+
+# Guest/User chỉ xem sản phẩm active và đúng các trường PRODUCT_LIST_FIELDS;
+# repository đẩy cả hai xuống query để Mongo không trả về trường/sản phẩm thừa.
+# image_url thiếu thì Mongo trả "" như client vẫn nhận trước đây.
+PRODUCT_LIST_FIELDS = ("name", "code", "category", "sell_price", "image_url", "total_quantity")
+# Ngoài ra document trong trang còn có các trường nội bộ, không trả cho client:
+# updated_at (ETag/Last-Modified), _id và trường sort (phân trang tự thêm để sinh cursor)
+PRODUCT_LIST_PROJECTION = {
+    "_id": 0,
+    **dict.fromkeys(PRODUCT_LIST_FIELDS, 1),
+    "image_url": {"$ifNull": ["$image_url", ""]},
+    "updated_at": 1,
+}
+PRODUCT_LIST_PREDICATES = {"status": Product_Status.ACTIVE}
+
+SUPPLIER_LIST_PROJECTION = {
+    "_id": 0,
+    "code": 1,
+    "name": 1,
+    "address": 1,
+    "phone": 1,
+    "email": 1,
+    "updated_at": 1,
+}
+SUPPLIER_LIST_PREDICATES = {"status": Supplier_Status.ACTIVE}
+
+# Lịch sử đơn hàng chỉ gồm thông tin tóm tắt; danh sách sản phẩm (items) chỉ
+# trả về ở GET /orders/<order_id>, danh sách chỉ cần số dòng item_count
+ORDER_LIST_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "order_status": 1,
+    "payment_status": 1,
+    "payment_method": 1,
+    "price": 1,
+    "total_amount": 1,
+    "shipping_address": 1,
+    "note": 1,
+    "created_at": 1,
+    "item_count": {"$size": {"$ifNull": ["$items", []]}},
+}
+
+
 def product_list_view(products_data):
-    result = []
-    for product in products_data:
-        if product.get("status") == Product_Status.ACTIVE:
-            result.append({
-                "name": product.get("name"),
-                "code": product.get("code"),
-                "category": product.get("category"),
-                "sell_price": product.get("sell_price"),
-                "image_url": product.get("image_url", ""),
-                "total_quantity": product.get("total_quantity")
-            })
-    return result
+    # Chỉ chọn lại các trường công khai của một trang (tối đa PRODUCT_MAX_PAGE_SIZE);
+    # không sửa document tại chỗ vì trang nằm trong catalog cache và còn cần cho ETag
+    products = [
+        {field: product[field] for field in PRODUCT_LIST_FIELDS if field in product}
+        for product in products_data
+    ]
+    return {"products": products, "count": len(products)}
 
 def supplier_list_view(suppliers_data):
     result = []
     for supplier in suppliers_data:
-        if supplier.get("status") == Supplier_Status.ACTIVE:
-            result.append({
-                "supplier_code": supplier.get("code"),
-                "supplier_name": supplier.get("name"),
-                "address": supplier.get("address"),
-                "phone": supplier.get("phone"),
-                "email": supplier.get("email")
-            })
-    return result
\ No newline at end of file
+        result.append({
+            "supplier_code": supplier.get("code"),
+            "supplier_name": supplier.get("name"),
+            "address": supplier.get("address"),
+            "phone": supplier.get("phone"),
+            "email": supplier.get("email")
+        })
+    return result
+
+def order_detail_view(order):
+    """Đơn hàng trả cho user: bỏ giá nhập (import_price) chụp trên từng dòng."""
+    for item in order.get("items") or []:
+        item.pop("import_price", None)
+    return order
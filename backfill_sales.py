@@ -0,0 +1,47 @@
+"""
+Backfill rollup doanh số theo ngày (collection sales_daily) từ collection order.
+
+Chạy lần đầu sau khi bật rollup, hoặc khi cần sửa sai lệch:
+    python backfill_sales.py                               # toàn bộ đơn
+    python backfill_sales.py --from 2025-01-01 --to 2025-01-31
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from backend.databases.mongodb import MongoDB
+from backend.databases.order_collection import OrderRepository
+from backend.databases.product_collection import ProductRepository
+from backend.databases.sales_collection import SalesRollupRepository
+
+
+async def backfill_sales(from_day: str = None, to_day: str = None):
+    """Tính lại rollup cho các ngày trong [from_day, to_day] (mặc định toàn bộ)."""
+    db = MongoDB()
+    try:
+        sales_repo = SalesRollupRepository(db)
+        order_repo = OrderRepository(db, sales_repo)
+        product_repo = ProductRepository(db)
+
+        # created_at là chuỗi ISO nên so sánh chuỗi đúng theo thứ tự thời gian
+        created_at = {}
+        if from_day:
+            created_at["$gte"] = from_day
+        if to_day:
+            created_at["$lt"] = (date.fromisoformat(to_day) + timedelta(days=1)).isoformat()
+        query = {"created_at": created_at} if created_at else {}
+
+        print("🔄 Backfilling sales rollups...")
+        # Gồm cả đơn đã chuyển sang order_archive
+        days = await sales_repo.rebuild(order_repo.find_all(query), product_repo, from_day, to_day)
+        print(f"✅ Rebuilt {days} daily rollups\n")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="from_day", help="Ngày bắt đầu YYYY-MM-DD")
+    parser.add_argument("--to", dest="to_day", help="Ngày kết thúc YYYY-MM-DD (tính cả ngày này)")
+    args = parser.parse_args()
+    asyncio.run(backfill_sales(args.from_day, args.to_day))
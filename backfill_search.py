@@ -0,0 +1,35 @@
+"""
+Backfill trường search (bản không dấu của name/category/description) cho sản phẩm.
+
+Sản phẩm tạo trước khi có tìm kiếm /products?q= không có trường này nên không
+bao giờ khớp text index. Chạy một lần sau khi deploy trên database đã có dữ liệu:
+    python backfill_search.py          # chỉ sản phẩm chưa có search
+    python backfill_search.py --all    # tính lại cho mọi sản phẩm
+"""
+import argparse
+import asyncio
+
+from backend.databases.mongodb import MongoDB
+from backend.databases.product_collection import ProductRepository
+
+
+async def backfill_search(rebuild_all: bool = False):
+    """Tạo text index (nếu chưa có) rồi tính trường search cho sản phẩm."""
+    db = MongoDB()
+    try:
+        product_repo = ProductRepository(db)
+        await product_repo._ensure_indexes()
+
+        print("🔄 Backfilling product search fields...")
+        updated = await product_repo.rebuild_search_index(only_missing=not rebuild_all)
+        print(f"✅ Updated {updated} products\n")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", dest="rebuild_all", action="store_true",
+                        help="Tính lại cho mọi sản phẩm, không chỉ sản phẩm thiếu search")
+    args = parser.parse_args()
+    asyncio.run(backfill_search(args.rebuild_all))
@@ -0,0 +1,30 @@
+"""Micro-benchmark: tốc độ sinh order ID Snowflake trên một worker.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_order_ids
+"""
+import time
+
+from backend.utils.snowflake import SnowflakeGenerator
+
+
+def main(count: int = 2_000_000):
+    generator = SnowflakeGenerator(worker_id=1)
+    next_id = generator.next_id
+
+    started = time.perf_counter()
+    ids = [next_id() for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    print(f"next_id               {count / elapsed / 1e6:6.2f} triệu ID/s")
+
+    started = time.perf_counter()
+    order_ids = [f"ORD{next_id():019d}" for _ in range(count)]
+    elapsed = time.perf_counter() - started
+    print(f"order_id (chuỗi)      {count / elapsed / 1e6:6.2f} triệu ID/s")
+
+    assert len(set(ids)) == count and ids == sorted(ids), "ID phải không trùng và tăng dần"
+    assert order_ids == sorted(order_ids), "order_id phải tăng dần theo thứ tự chuỗi"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Benchmark đặt hàng: chuỗi ghi cũ so với OrderRepository.place_order.
+
+Bắn đơn với tốc độ cố định (open-loop, mặc định 500 đơn/s) vào một database
+riêng và in throughput thực tế cùng độ trễ p50/p95/p99 cho từng cách:
+
+- legacy:      insert_one đơn rồi $inc tồn kho từng dòng (trước đây, chỉ còn trong benchmark)
+- sequential:  place_order trên đường fallback cho server standalone
+- transaction: place_order trong multi-document transaction (cần replica set)
+
+Cột "conflict" đếm số lệnh bị server trả WriteConflict (mỗi lần là một lần
+with_transaction phải chạy lại transaction). `--hot N` dồn mọi đơn vào N sản
+phẩm đầu để đo tranh chấp trên sản phẩm bán chạy (--hot 1: mọi đơn cùng một
+sản phẩm).
+
+Chạy từ thư mục gốc của repo (database sẽ bị xóa trước mỗi lần chạy):
+    python -m benchmarks.bench_order_placement --rate 500 --seconds 10
+    python -m benchmarks.bench_order_placement --uri "mongodb://localhost:27017/?replicaSet=rs0" --hot 1
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+
+from pymongo import monitoring
+
+from config import Config
+from backend.databases.cart_collection import CartRepository
+from backend.databases.mongodb import MongoDB
+from backend.databases.order_collection import OrderRepository
+from backend.databases.product_collection import ProductRepository
+
+
+PRODUCTS = 200
+LINES_PER_ORDER = 3
+WRITE_CONFLICT = 112
+
+
+class _ConflictCounter(monitoring.CommandListener):
+    """Đếm lệnh thất bại vì WriteConflict; đăng ký trước khi tạo client."""
+
+    def __init__(self):
+        self.conflicts = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        if event.failure.get("code") == WRITE_CONFLICT:
+            self.conflicts += 1
+
+
+conflict_counter = _ConflictCounter()
+
+
+async def _seed(db):
+    await db.client.drop_database(Config.MONGO_DB_NAME)
+    product_repo = ProductRepository(db)
+    order_repo = OrderRepository(db)
+    cart_repo = CartRepository(db)
+    for repo in (product_repo, order_repo, cart_repo):
+        await repo._ensure_indexes()
+    await product_repo.product.insert_many([
+        {"code": f"BENCH{i:04d}", "name": f"Bench {i}", "sell_price": 10000,
+         "total_quantity": 10_000_000, "status": "active"}
+        for i in range(PRODUCTS)
+    ])
+    return product_repo, order_repo, cart_repo
+
+
+def _new_order(products=PRODUCTS):
+    items = [
+        {"product_id": f"BENCH{random.randrange(products):04d}", "name": "Bench", "price": 10000, "quantity": 1}
+        for _ in range(LINES_PER_ORDER)
+    ]
+    order = {
+        "order_id": f"BENCH-{uuid.uuid4().hex}",
+        "user_id": f"bench{random.randrange(1000)}",
+        "items": items,
+        "price": 10000 * LINES_PER_ORDER,
+        "payment_method": "cod",
+    }
+    quantities = {}
+    for item in items:
+        quantities[item["product_id"]] = quantities.get(item["product_id"], 0) + item["quantity"]
+    return order, quantities
+
+
+async def _legacy_insert_then_decrement(product_repo, order_repo, cart_repo, order, quantities):
+    """Baseline: chuỗi ghi trước khi có place_order, dựng lại ngay trong benchmark.
+
+    insert_one đơn rồi mỗi dòng một update_one $inc không điều kiện (có thể âm
+    tồn kho, không transaction, không rollup/event); repository không còn đường này.
+    """
+    await order_repo.order.insert_one(order)
+    for code, quantity in quantities.items():
+        await product_repo.product.update_one(
+            {"code": code}, {"$inc": {"total_quantity": -quantity}}
+        )
+
+
+async def _place(product_repo, order_repo, cart_repo, order, quantities):
+    created, _ = await order_repo.place_order(order, quantities, product_repo, cart_repo)
+    if not created:
+        raise RuntimeError("out of stock")
+
+
+async def _run(name, place, repos, rate, seconds, products=PRODUCTS):
+    latencies, errors = [], 0
+    conflict_counter.conflicts = 0
+
+    async def one():
+        nonlocal errors
+        order, quantities = _new_order(products)
+        started = time.perf_counter()
+        try:
+            await place(*repos, order, quantities)
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one()))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"{name:<12} không có đơn thành công ({errors} lỗi)")
+        return
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<12} {len(latencies) / elapsed:8.1f} đơn/s  "
+        f"p50 {cuts[49] * 1000:6.1f} ms  p95 {cuts[94] * 1000:6.1f} ms  "
+        f"p99 {cuts[98] * 1000:6.1f} ms  lỗi {errors}  conflict {conflict_counter.conflicts}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=Config.MONGO_URI)
+    parser.add_argument("--db", default="bench_order_placement")
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--hot", type=int, default=PRODUCTS,
+                        help="chỉ đặt N sản phẩm đầu (1 = mọi đơn tranh chấp cùng một sản phẩm)")
+    args = parser.parse_args()
+    products = min(max(args.hot, 1), PRODUCTS)
+
+    Config.MONGO_DB_NAME = args.db
+    monitoring.register(conflict_counter)
+    db = MongoDB(args.uri)
+    try:
+        for name, place in (("legacy", _legacy_insert_then_decrement), ("sequential", _place), ("transaction", _place)):
+            repos = await _seed(db)
+            order_repo = repos[1]
+            if name == "sequential":
+                order_repo._transactions_supported = False
+            elif name == "transaction" and not await order_repo.supports_transactions():
+                print(f"{name:<12} bỏ qua: server không hỗ trợ transaction (cần replica set)")
+                continue
+            await _run(name, place, repos, args.rate, args.seconds, products)
+        await db.client.drop_database(args.db)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
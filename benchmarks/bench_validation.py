@@ -0,0 +1,47 @@
+"""Micro-benchmark: jsonschema.validate so với validator compile sẵn trên create_order_schema.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_validation
+"""
+import timeit
+
+from jsonschema import validate
+
+from backend.models.order import create_order_schema
+from backend.utils.validation import validate_data
+
+
+ORDER = {
+    "order_id": "ORD-20250101000000-ABC123",
+    "user_id": "user01",
+    "items": [
+        {"product_id": f"PRD{i:03d}", "name": f"Sản phẩm {i}", "price": 125000, "quantity": 2}
+        for i in range(5)
+    ],
+    "total_amount": 1250000,
+    "price": 1250000,
+    "shipping_address": {
+        "receiver_name": "Nguyễn Văn A",
+        "phone": "0901234567",
+        "full_address": "1 Lê Lợi, Quận 1, TP.HCM",
+    },
+    "payment_method": "cod",
+    "note": "",
+}
+
+
+def _bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    per_call = seconds / number * 1e6
+    print(f"{label:<28} {per_call:8.1f} µs/lần")
+    return per_call
+
+
+def main(number: int = 2000):
+    baseline = _bench("jsonschema.validate", lambda: validate(ORDER, create_order_schema), number)
+    compiled = _bench("validate_data (compile sẵn)", lambda: validate_data(ORDER, create_order_schema), number)
+    print(f"Nhanh hơn {baseline / compiled:.1f} lần")
+
+
+if __name__ == "__main__":
+    main()
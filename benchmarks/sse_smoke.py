@@ -0,0 +1,39 @@
+"""Kiểm tra thủ công stream SSE /events mà không cần MongoDB.
+
+Dựng một app Sanic chỉ gồm blueprint events và route /pub/<n> phát n event
+order.created giả (cộng một stock.changed) thẳng vào event_bus; không đi qua
+repository nên không kiểm tra việc publish sau khi ghi DB.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.sse_smoke            # in token admin rồi chạy ở cổng 8765
+
+Ở terminal khác (TOKEN là dòng đầu tiên script in ra):
+    curl -sN -H "Authorization: Bearer $TOKEN" "http://127.0.0.1:8765/events?topics=stock"
+    curl -sN -H "Authorization: Bearer $TOKEN" "http://127.0.0.1:8765/events"
+    curl -s http://127.0.0.1:8765/pub/2      # client 1 chỉ nhận stock.changed, client 2 nhận cả 3
+    curl -s http://127.0.0.1:8765/pub/600    # vượt EVENTS_QUEUE_SIZE: client chậm nhận event resync
+    curl -s -o /dev/null -w "%{http_code}\\n" http://127.0.0.1:8765/events   # 401 khi thiếu token
+"""
+import jwt
+from sanic import Sanic, json
+
+from config import Config
+from backend.apis.events_manager import events
+from backend.misc.events import event_bus
+
+
+app = Sanic("sse_smoke")
+app.blueprint(events)
+
+
+@app.get("/pub/<n:int>")
+async def publish(request, n):
+    for i in range(n):
+        event_bus.publish("order.created", {"order_id": f"ORD{i}"})
+    event_bus.publish("stock.changed", {"changes": [{"code": "SMOKE", "delta": -1}]})
+    return json(event_bus.stats())
+
+
+if __name__ == "__main__":
+    print(jwt.encode({"role": "admin", "username": "smoke"}, Config.SECRET_KEY, algorithm="HS256"), flush=True)
+    app.run(port=8765, single_process=True, access_log=False)
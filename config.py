@@ -16,6 +16,14 @@ class Config:
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "web_ban_hang_mini")
 
+    # Connection pool of the single MongoClient shared by each worker
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 3000))
+    # zlib ships with Python; snappy/zstd need python-snappy/zstandard installed
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+
     # Allow frontend (5173) and localhost by default
     CORS_ORIGINS = [
         o.strip() for o in os.getenv(
@@ -24,5 +32,49 @@ class Config:
         ).split(",") if o.strip()
     ]
 
+    # In-process product catalog cache (per worker)
+    PRODUCT_CACHE_MAXSIZE = int(os.getenv("PRODUCT_CACHE_MAXSIZE", 1024))
+    PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", 30))
+    # In-process supplier directory (code/name -> supplier), reloaded after TTL or any write
+    SUPPLIER_CACHE_TTL = float(os.getenv("SUPPLIER_CACHE_TTL", 300))
+    # Cache-Control max-age for guest (public) catalog/supplier listings
+    PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", 30))
+
+    # Bulk import: số dòng mỗi lần insert_many
+    BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 1000))
+    # Export: số document mỗi batch đọc từ Mongo và mỗi lần gửi về client
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Nén response: bỏ qua body nhỏ hơn MIN_SIZE, nén trong thread khi body từ OFFLOAD_SIZE
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", 256 * 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+
+    # Order ID kiểu Snowflake: mỗi node (máy/container) một SNOWFLAKE_NODE_ID riêng (0..31)
+    SNOWFLAKE_NODE_ID = int(os.getenv("SNOWFLAKE_NODE_ID", 0))
+    # Mốc thời gian của ID (ms, UTC 2024-01-01); đổi mốc sẽ làm ID mới không còn tăng dần
+    SNOWFLAKE_EPOCH_MS = int(os.getenv("SNOWFLAKE_EPOCH_MS", 1704067200000))
+
+    # Danh sách sản phẩm luôn phân trang (kết quả được cache theo trang): số sản phẩm mặc định / tối đa mỗi trang
+    PRODUCT_PAGE_SIZE = int(os.getenv("PRODUCT_PAGE_SIZE", 50))
+    PRODUCT_MAX_PAGE_SIZE = int(os.getenv("PRODUCT_MAX_PAGE_SIZE", 200))
+
+    # Danh sách đơn hàng luôn phân trang: số đơn mặc định / tối đa mỗi trang
+    ORDER_PAGE_SIZE = int(os.getenv("ORDER_PAGE_SIZE", 50))
+    ORDER_MAX_PAGE_SIZE = int(os.getenv("ORDER_MAX_PAGE_SIZE", 200))
+
+    # /orders/stats: khoảng ngày tối đa mỗi lần truy vấn rollup
+    SALES_STATS_MAX_DAYS = int(os.getenv("SALES_STATS_MAX_DAYS", 366))
+
+    # SSE /events: số event tối đa chờ gửi cho mỗi client, và chu kỳ heartbeat (giây)
+    EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 256))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+
+    # Archiver: chuyển đơn success/cancelled cũ hơn AFTER_DAYS ngày sang order_archive,
+    # mỗi INTERVAL giây (0 để tắt), mỗi lần BATCH_SIZE đơn
+    ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 90))
+    ORDER_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ORDER_ARCHIVE_INTERVAL_SECONDS", 3600))
+    ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", 1000))
+
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     EXPIRATION_JWT = 3600
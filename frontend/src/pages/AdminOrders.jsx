@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import { FiChevronDown, FiCheckCircle } from 'react-icons/fi';
-import { getOrders, updateOrderStatus } from '../services/orderService';
+import { getOrder, getOrders, updateOrderStatus } from '../services/orderService';
+import { subscribeEvents } from '../services/eventService';
 import Loading from '../components/Loading';
 
 const ORDER_STATUSES = ['processing', 'success'];
@@ -11,14 +12,31 @@ const STATUS_LABELS = {
 
 export default function AdminOrders() {
   const [orders, setOrders] = useState([]);
+  // Server trả từng trang; next_cursor null nghĩa là đã tải hết
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [expandedOrder, setExpandedOrder] = useState(null);
   const [statusUpdate, setStatusUpdate] = useState({});
+  // Danh sách chỉ có thông tin tóm tắt; items được tải khi mở từng đơn
+  const [details, setDetails] = useState({});
 
   useEffect(() => {
     fetchOrders();
+    // Cập nhật danh sách theo event của server thay vì tải lại toàn bộ
+    return subscribeEvents(['order'], ({ type, data }) => {
+      if (type === 'order.created') {
+        setOrders(prev => prev.some(o => o.order_id === data.order_id) ? prev : [data, ...prev]);
+      } else if (type === 'order.updated') {
+        setOrders(prev => prev.map(o => o.order_id === data.order_id ? { ...o, ...data } : o));
+      } else if (type === 'order.deleted') {
+        setOrders(prev => prev.filter(o => o.order_id !== data.order_id));
+      } else if (type === 'resync') {
+        fetchOrders();
+      }
+    });
   }, []);
 
   const fetchOrders = async () => {
@@ -27,6 +45,7 @@ export default function AdminOrders() {
     try {
       const res = await getOrders({});
       setOrders(res.orders || []);
+      setNextCursor(res.next_cursor || null);
     } catch (e) {
       console.error('Order fetch error:', e);
       setError(e?.response?.data?.error || e?.error || e?.message || 'Lỗi tải đơn hàng');
@@ -35,6 +54,47 @@ export default function AdminOrders() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getOrders({ after: nextCursor });
+      setOrders(prev => [...prev, ...(res.orders || [])]);
+      setNextCursor(res.next_cursor || null);
+    } catch (e) {
+      alert('Lỗi: ' + (e?.response?.data?.error || e.message));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Đơn nằm ở trang chưa tải: Enter để tìm chính xác theo mã trên server
+  const searchOnServer = async (e) => {
+    const orderId = searchTerm.trim();
+    if (e.key !== 'Enter' || !orderId || orders.some(o => o.order_id === orderId)) return;
+    try {
+      const res = await getOrder(orderId);
+      setDetails(prev => ({ ...prev, [orderId]: res.order }));
+      setOrders(prev => [{ ...res.order, item_count: res.order.items?.length || 0 }, ...prev]);
+    } catch (err) {
+      alert('Không tìm thấy đơn hàng ' + orderId);
+    }
+  };
+
+  const toggleOrder = async (orderId) => {
+    if (expandedOrder === orderId) {
+      setExpandedOrder(null);
+      return;
+    }
+    setExpandedOrder(orderId);
+    if (details[orderId]) return;
+    try {
+      const res = await getOrder(orderId);
+      setDetails(prev => ({ ...prev, [orderId]: res.order }));
+    } catch (e) {
+      console.error('Order detail error:', e);
+    }
+  };
+
   const handleStatusUpdate = async (orderId, newStatus) => {
     try {
       await updateOrderStatus(orderId, { order_status: newStatus });
@@ -61,6 +121,7 @@ export default function AdminOrders() {
           placeholder="TÌm theo mã đơn hàng..."
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
+          onKeyDown={searchOnServer}
           className="input"
           style={{width:250}}
         />
@@ -83,12 +144,12 @@ export default function AdminOrders() {
                   justifyContent:'space-between',
                   alignItems:'center'
                 }}
-                onClick={() => setExpandedOrder(expandedOrder === order.order_id ? null : order.order_id)}
+                onClick={() => toggleOrder(order.order_id)}
               >
                 <div>
                   <div style={{fontWeight:700,fontSize:16}}>Đơn #{order.order_id}</div>
                   <div style={{color:'#6b7280',fontSize:14,marginTop:4}}>
-                    Khách: {order.shipping_address?.receiver_name || 'N/A'} • {order.items?.length || 0} sản phẩm
+                    Khách: {order.shipping_address?.receiver_name || 'N/A'} • {order.item_count ?? 0} sản phẩm
                   </div>
                 </div>
                 <div style={{display:'flex',alignItems:'center',gap:12}}>
@@ -154,7 +215,7 @@ export default function AdminOrders() {
                         </tr>
                       </thead>
                       <tbody>
-                        {order.items?.map((item, idx) => (
+                        {details[order.order_id]?.items?.map((item, idx) => (
                           <tr key={idx}>
                             <td>{item.name}</td>
                             <td style={{textAlign:'right'}}>{item.price?.toLocaleString()}đ</td>
@@ -196,6 +257,11 @@ export default function AdminOrders() {
             </div>
           ))
         )}
+        {nextCursor && (
+          <button className="btn" onClick={loadMore} disabled={loadingMore} style={{alignSelf:'center'}}>
+            {loadingMore ? 'Đang tải...' : 'Xem thêm đơn hàng'}
+          </button>
+        )}
       </div>
     </div>
   );
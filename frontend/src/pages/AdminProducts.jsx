@@ -1,13 +1,19 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { FiEdit, FiEye, FiTrash2, FiPlus } from 'react-icons/fi';
-import { getProducts, createProduct, updateProduct, deleteProduct } from '../services/productService';
+import { getProducts, searchProducts, createProduct, updateProduct, deleteProduct } from '../services/productService';
+import { subscribeEvents } from '../services/eventService';
 import Loading from '../components/Loading';
 
 export default function AdminProducts() {
   const [products, setProducts] = useState([]);
+  // Server trả từng trang; next_cursor null nghĩa là đã tải hết
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
+  // Từ khóa đang áp dụng (Enter); ref để cả handler event resync cũng tải lại đúng kết quả tìm
+  const query = useRef('');
   const [selectedProduct, setSelectedProduct] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [isViewMode, setIsViewMode] = useState(false);
@@ -16,13 +22,27 @@ export default function AdminProducts() {
 
   useEffect(() => {
     fetchProducts();
+    // Cập nhật tồn kho theo event của server thay vì tải lại toàn bộ
+    return subscribeEvents(['stock'], ({ type, data }) => {
+      if (type === 'stock.changed') {
+        const changes = Object.fromEntries(data.changes.map(c => [c.code, c]));
+        setProducts(prev => prev.map(p => {
+          const change = changes[p.code];
+          if (!change) return p;
+          return { ...p, total_quantity: change.total_quantity ?? p.total_quantity + change.delta };
+        }));
+      } else if (type === 'resync') {
+        fetchProducts();
+      }
+    });
   }, []);
 
   const fetchProducts = async () => {
     setLoading(true);
     try {
-      const res = await getProducts({});
+      const res = query.current ? await searchProducts(query.current) : await getProducts({});
       setProducts(res.products || []);
+      setNextCursor(res.next_cursor || null);
     } catch (e) {
       setError(e?.error || 'Lỗi tải sản phẩm');
     } finally {
@@ -30,6 +50,26 @@ export default function AdminProducts() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getProducts({ after: nextCursor });
+      setProducts(prev => [...prev, ...(res.products || [])]);
+      setNextCursor(res.next_cursor || null);
+    } catch (e) {
+      setError(e?.error || 'Lỗi tải sản phẩm');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Tìm trên server thay vì lọc các trang đã tải: sản phẩm ở trang chưa tải vẫn tìm được
+  const handleSearch = (e) => {
+    if (e.key !== 'Enter') return;
+    query.current = searchTerm.trim();
+    fetchProducts();
+  };
+
   const handleViewDetails = (product) => {
     setSelectedProduct(product);
     setEditForm({ ...product });
@@ -117,11 +157,6 @@ export default function AdminProducts() {
   if (loading) return <Loading text="Đang tải sản phẩm..." />;
   if (error) return <div style={{color:'#ef4444',padding:24}}>{error}</div>;
 
-  const filteredProducts = products.filter(p => 
-    p.code.toLowerCase().includes(searchTerm.toLowerCase()) || 
-    p.name.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   return (
     <div>
       <div style={{display:'flex',justifyContent:'space-between',alignItems:'center',marginBottom:24}}>
@@ -129,9 +164,10 @@ export default function AdminProducts() {
         <div style={{display:'flex',gap:12,alignItems:'center'}}>
           <input
             type="text"
-            placeholder="Tìm theo mã hoặc tên..."
+            placeholder="Tìm theo mã hoặc tên (Enter)..."
             value={searchTerm}
             onChange={(e) => setSearchTerm(e.target.value)}
+            onKeyDown={handleSearch}
             className="input"
             style={{width:250}}
           />
@@ -155,7 +191,7 @@ export default function AdminProducts() {
             </tr>
           </thead>
           <tbody>
-            {filteredProducts.map((p) => (
+            {products.map((p) => (
               <tr key={p.code}>
                 <td style={{fontWeight:600}}>{p.code}</td>
                 <td>{p.name}</td>
@@ -212,6 +248,13 @@ export default function AdminProducts() {
           </tbody>
         </table>
       </div>
+      {nextCursor && (
+        <div style={{display:'flex',justifyContent:'center',marginTop:16}}>
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Đang tải...' : 'Xem thêm sản phẩm'}
+          </button>
+        </div>
+      )}
 
       {/* Modal */}
       {showModal && (
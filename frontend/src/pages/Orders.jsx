@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { getOrders } from '../services/orderService';
+import { getOrder, getOrders } from '../services/orderService';
 import { FiChevronDown, FiPackage, FiMapPin, FiCreditCard } from 'react-icons/fi';
 import Loading from '../components/Loading';
 
@@ -16,10 +16,15 @@ const PAYMENT_LABELS = {
 
 export default function Orders() {
   const [data, setData] = useState({ orders: [], count: 0 });
+  // Server trả từng trang; next_cursor null nghĩa là đã tải hết
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
   const [expandedOrder, setExpandedOrder] = useState(null);
+  // Danh sách chỉ có thông tin tóm tắt; items được tải khi mở từng đơn
+  const [details, setDetails] = useState({});
 
   const fetchData = async () => {
     setLoading(true);
@@ -27,6 +32,7 @@ export default function Orders() {
     try {
       const res = await getOrders();
       setData({ orders: res.orders || [], count: res.count || 0 });
+      setNextCursor(res.next_cursor || null);
     } catch (e) {
       setError(e?.error || 'Lỗi tải đơn hàng');
     } finally {
@@ -34,10 +40,52 @@ export default function Orders() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getOrders({ after: nextCursor });
+      const orders = [...data.orders, ...(res.orders || [])];
+      setData({ orders, count: orders.length });
+      setNextCursor(res.next_cursor || null);
+    } catch (e) {
+      setError(e?.error || 'Lỗi tải đơn hàng');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
 
+  // Đơn nằm ở trang chưa tải: Enter để tìm chính xác theo mã trên server
+  const searchOnServer = async (e) => {
+    const orderId = searchTerm.trim();
+    if (e.key !== 'Enter' || !orderId || data.orders.some(o => o.order_id === orderId)) return;
+    try {
+      const res = await getOrder(orderId);
+      setDetails(prev => ({ ...prev, [orderId]: res.order }));
+      setData(prev => ({ orders: [{ ...res.order, item_count: res.order.items?.length || 0 }, ...prev.orders], count: prev.count + 1 }));
+    } catch (err) {
+      alert('Không tìm thấy đơn hàng ' + orderId);
+    }
+  };
+
+  const toggleOrder = async (orderId) => {
+    if (expandedOrder === orderId) {
+      setExpandedOrder(null);
+      return;
+    }
+    setExpandedOrder(orderId);
+    if (details[orderId]) return;
+    try {
+      const res = await getOrder(orderId);
+      setDetails(prev => ({ ...prev, [orderId]: res.order }));
+    } catch (e) {
+      console.error('Order detail error:', e);
+    }
+  };
+
   if (loading) return <Loading text="Đang tải đơn hàng..." />;
   if (error) return <div style={{ color: '#ef4444', padding: 24 }}>{error}</div>;
 
@@ -54,6 +102,7 @@ export default function Orders() {
           placeholder="TÌm theo mã đơn hàng..."
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
+          onKeyDown={searchOnServer}
           className="input"
           style={{width:250}}
         />
@@ -79,7 +128,7 @@ export default function Orders() {
                   justifyContent:'space-between',
                   alignItems:'center'
                 }}
-                onClick={() => setExpandedOrder(expandedOrder === order.order_id ? null : order.order_id)}
+                onClick={() => toggleOrder(order.order_id)}
               >
                 <div>
                   <div style={{fontWeight:700,fontSize:16}}>Đơn hàng #{order.order_id}</div>
@@ -175,7 +224,7 @@ export default function Orders() {
                   <div>
                     <div style={{display:'flex',alignItems:'center',gap:8,marginBottom:12}}>
                       <FiPackage size={20} style={{color:'#667eea'}}/>
-                      <h3 style={{margin:0,fontSize:16,fontWeight:700}}>Sản phẩm ({order.items?.length || 0})</h3>
+                      <h3 style={{margin:0,fontSize:16,fontWeight:700}}>Sản phẩm ({order.item_count ?? 0})</h3>
                     </div>
                     <div className="card" style={{padding:0,overflow:'auto'}}>
                       <table className="table" style={{margin:0}}>
@@ -188,7 +237,7 @@ export default function Orders() {
                           </tr>
                         </thead>
                         <tbody>
-                          {(order.items || []).map((item, idx) => (
+                          {(details[order.order_id]?.items || []).map((item, idx) => (
                             <tr key={idx}>
                               <td>
                                 <div style={{fontWeight:600}}>{item.name}</div>
@@ -238,6 +287,11 @@ export default function Orders() {
               )}
             </div>
           ))}
+          {nextCursor && (
+            <button className="btn" onClick={loadMore} disabled={loadingMore} style={{alignSelf:'center'}}>
+              {loadingMore ? 'Đang tải...' : 'Xem thêm đơn hàng'}
+            </button>
+          )}
         </div>
       )}
     </div>
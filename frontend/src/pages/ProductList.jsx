@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom';
-import { getProducts } from '../services/productService';
+import { getProducts, searchProducts } from '../services/productService';
 import { useAuth } from '../context/AuthContext';
 import { useCart } from '../context/CartContext';
 import Loading from '../components/Loading';
@@ -11,27 +11,37 @@ const CATEGORIES = ['Thực phẩm', 'Quần áo', 'Điện tử', 'Đồ gia d
 
 export default function ProductList() {
   const [data, setData] = useState({ products: [], count: 0 });
+  // Server trả từng trang; next_cursor null nghĩa là đã tải hết
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
-  const [searchTerm, setSearchTerm] = useState('');
   const [notification, setNotification] = useState('');
   const { user } = useAuth();
   const { addItem } = useCart();
   const navigate = useNavigate();
 
   const [searchParams] = useSearchParams();
+  // Ô tìm kiếm chỉ là bản nháp; Enter mới đưa từ khóa lên URL (?q=) và tìm trên server
+  const [searchTerm, setSearchTerm] = useState(searchParams.get('q') || '');
+
+  const getFilters = () => {
+    const filters = {};
+    const name = searchParams.get('name');
+    const category = searchParams.get('category');
+    if (name) filters.name = name;
+    if (category) filters.category = category;
+    return filters;
+  };
 
   const fetchData = async () => {
     setLoading(true);
     setError('');
     try {
-      const filters = {};
-      const name = searchParams.get('name');
-      const category = searchParams.get('category');
-      if (name) filters.name = name;
-      if (category) filters.category = category;
-      const res = await getProducts(filters);
+      const q = searchParams.get('q');
+      const res = q ? await searchProducts(q, getFilters()) : await getProducts(getFilters());
       setData({ products: res.products || [], count: res.count || 0 });
+      setNextCursor(res.next_cursor || null);
     } catch (e) {
       setError(e?.error || 'Lỗi tải sản phẩm');
     } finally {
@@ -39,6 +49,20 @@ export default function ProductList() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getProducts({ ...getFilters(), after: nextCursor });
+      const products = [...data.products, ...(res.products || [])];
+      setData({ products, count: products.length });
+      setNextCursor(res.next_cursor || null);
+    } catch (e) {
+      setError(e?.error || 'Lỗi tải sản phẩm');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -54,6 +78,18 @@ export default function ProductList() {
     navigate(`/products?${params.toString()}`);
   };
 
+  const handleSearch = (e) => {
+    if (e.key !== 'Enter') return;
+    const params = new URLSearchParams(searchParams);
+    const q = searchTerm.trim();
+    if (q) {
+      params.set('q', q);
+    } else {
+      params.delete('q');
+    }
+    navigate(`/products?${params.toString()}`);
+  };
+
   const handleNotLoggedIn = () => {
     setNotification('Vui lòng đăng nhập để mua hàng');
     setTimeout(() => setNotification(''), 3000);
@@ -64,11 +100,6 @@ export default function ProductList() {
   if (loading) return <Loading text="Đang tải sản phẩm..." />;
   if (error) return <div style={{ color: 'red', padding: 24 }}>{error}</div>;
 
-  const filteredProducts = data.products.filter(product =>
-    product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    product.code.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   return (
     <div>
       {notification && (
@@ -90,9 +121,10 @@ export default function ProductList() {
         <h2 className="section-title" style={{margin:0}}>Sản phẩm</h2>
         <input
           type="text"
-          placeholder="Tìm kiếm sản phẩm..."
+          placeholder="Tìm kiếm sản phẩm (Enter)..."
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
+          onKeyDown={handleSearch}
           className="input"
           style={{width:250}}
         />
@@ -135,8 +167,8 @@ export default function ProductList() {
 
       {/* Products Grid */}
       <div className="grid">
-        {filteredProducts.length > 0 ? (
-          filteredProducts.map((p) => (
+        {data.products.length > 0 ? (
+          data.products.map((p) => (
             <ProductCard
               key={p.code}
               product={p}
@@ -150,6 +182,13 @@ export default function ProductList() {
           </div>
         )}
       </div>
+      {nextCursor && (
+        <div style={{display:'flex',justifyContent:'center',marginTop:24}}>
+          <button className="btn" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Đang tải...' : 'Xem thêm sản phẩm'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
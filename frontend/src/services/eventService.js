@@ -0,0 +1,58 @@
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+const RETRY_MS = 3000;
+
+// Parse một frame SSE ("event: ...\ndata: ...") thành { type, data }
+const parseFrame = (frame) => {
+  let type = 'message';
+  const data = [];
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) type = line.slice(6).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+  }
+  if (!data.length) return null; // comment/heartbeat hoặc chỉ có retry
+  return { type, data: JSON.parse(data.join('\n')) };
+};
+
+/**
+ * Nghe stream /events (order.*, stock.*, resync) thay cho việc poll lại danh sách.
+ * Dùng fetch thay vì EventSource vì cần gửi header Authorization.
+ * Tự kết nối lại sau RETRY_MS khi mất kết nối; sau mỗi lần kết nối lại gọi
+ * onEvent({ type: 'resync' }) vì có thể đã lỡ event.
+ * Trả về hàm hủy đăng ký.
+ */
+export const subscribeEvents = (topics, onEvent) => {
+  const controller = new AbortController();
+  let connected = false;
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const res = await fetch(`${API_URL}/events?topics=${topics.join(',')}`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+          signal: controller.signal,
+        });
+        if (!res.ok) return; // 401/403: không thử lại
+        if (connected) onEvent({ type: 'resync', data: {} });
+        connected = true;
+
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          const frames = buffer.split('\n\n');
+          buffer = frames.pop();
+          frames.map(parseFrame).filter(Boolean).forEach(onEvent);
+        }
+      } catch (e) {
+        if (controller.signal.aborted) return;
+        console.error('Event stream error:', e);
+      }
+      await new Promise((resolve) => setTimeout(resolve, RETRY_MS));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
@@ -5,12 +5,20 @@ export const getOrders = async (filters = {}) => {
   if (filters.order_id) params.append('order_id', filters.order_id);
   if (filters.order_status) params.append('order_status', filters.order_status);
   if (filters.payment_status) params.append('payment_status', filters.payment_status);
+  // Phân trang: next_cursor của trang trước + số đơn mỗi trang
+  if (filters.after) params.append('after', filters.after);
+  if (filters.num) params.append('num', filters.num);
   const query = params.toString();
   const url = query ? `/orders?${query}` : '/orders';
   const res = await api.get(url);
   return res.data;
 };
 
+export const getOrder = async (orderId) => {
+  const res = await api.get(`/orders/${orderId}`);
+  return res.data;
+};
+
 export const createOrder = async (orderData) => {
   const res = await api.put('/orders', orderData);
   return res.data;
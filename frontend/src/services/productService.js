@@ -8,6 +8,12 @@ export const getProducts = async (filters = {}) => {
   if (filters.min_price) params.append('min_price', filters.min_price);
   if (filters.max_price) params.append('max_price', filters.max_price);
   if (filters.status) params.append('status', filters.status);
+  if (filters.product_code) params.append('product_code', filters.product_code);
+  // Tìm không dấu trên name/category/description (server xếp hạng, không phân trang)
+  if (filters.q) params.append('q', filters.q);
+  // Phân trang: next_cursor của trang trước + số sản phẩm mỗi trang
+  if (filters.after) params.append('after', filters.after);
+  if (filters.num) params.append('num', filters.num);
 
   const query = params.toString();
   const url = query ? `/products?${query}` : '/products';
@@ -15,6 +21,18 @@ export const getProducts = async (filters = {}) => {
   return res.data;
 };
 
+// Ô tìm kiếm: tìm theo từ khóa trên server, cộng thêm sản phẩm trùng đúng mã
+// (mã không nằm trong text index). Kết quả không phân trang.
+export const searchProducts = async (term, filters = {}) => {
+  const [byText, byCode] = await Promise.all([
+    getProducts({ ...filters, q: term }),
+    getProducts({ ...filters, product_code: term }),
+  ]);
+  const exact = byCode.products || [];
+  const products = [...exact, ...(byText.products || []).filter(p => !exact.some(e => e.code === p.code))];
+  return { products, count: products.length, next_cursor: null };
+};
+
 // Only endpoints that exist in backend are used.
 export const createProduct = async (productData) => {
   const res = await api.put('/products', productData);
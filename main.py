@@ -3,7 +3,18 @@ from sanic.response import text
 from sanic_cors import CORS
 from config import Config
 from backend.apis import api
-app = Sanic(Config.APP_NAME)
+from backend.databases.mongodb import MongoDB
+from backend.databases.cart_collection import CartRepository
+from backend.databases.order_collection import OrderRepository
+from backend.databases.product_collection import ProductRepository
+from backend.databases.sales_collection import SalesRollupRepository
+from backend.databases.supplier_collection import SupplierRepository
+from backend.databases.user_collection import UserRepository
+from backend.misc.archiver import run_order_archiver
+from backend.misc.compression import compress_response
+from backend.utils.serialization import dumps
+from backend.utils.snowflake import WORKERS_PER_NODE, current_worker_id
+app = Sanic(Config.APP_NAME, dumps=dumps)
 
 app.config.DEBUG = Config.DEBUG
 app.config.SECRET = Config.SECRET_KEY
@@ -12,6 +23,41 @@ app.config.SECRET = Config.SECRET_KEY
 CORS(app, origins="*")
 
 app.blueprint(api)
+app.on_response(compress_response)
+
+
+@app.before_server_start
+async def setup_db(app, _):
+    """Tạo một MongoClient duy nhất cho mỗi worker và inject vào các repository."""
+    app.ctx.db = MongoDB()
+    app.ctx.product_repo = ProductRepository(app.ctx.db)
+    app.ctx.supplier_repo = SupplierRepository(app.ctx.db)
+    app.ctx.sales_repo = SalesRollupRepository(app.ctx.db)
+    app.ctx.order_repo = OrderRepository(app.ctx.db, app.ctx.sales_repo)
+    app.ctx.cart_repo = CartRepository(app.ctx.db)
+    app.ctx.user_repo = UserRepository(app.ctx.db)
+    for repo in (
+        app.ctx.product_repo,
+        app.ctx.supplier_repo,
+        app.ctx.order_repo,
+        app.ctx.sales_repo,
+        app.ctx.cart_repo,
+        app.ctx.user_repo,
+    ):
+        await repo._ensure_indexes()
+
+
+@app.after_server_start
+async def start_order_archiver(app, _):
+    """Chỉ worker đầu tiên của mỗi node chạy archiver: chạy song song vẫn an toàn nhưng tốn công."""
+    if Config.ORDER_ARCHIVE_INTERVAL_SECONDS > 0 and current_worker_id() % WORKERS_PER_NODE == 0:
+        app.add_task(run_order_archiver(app.ctx.order_repo), name="order_archiver")
+
+
+@app.after_server_stop
+async def close_db(app, _):
+    await app.ctx.db.close()
+
 
 @app.get("/")
 async def hello_world(request):
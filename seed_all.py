@@ -1,6 +1,8 @@
 """
 Seed dữ liệu vào MongoDB cho các collection: users, suppliers, products, batches
 """
+import asyncio
+
 from backend.databases.mongodb import MongoDB
 from backend.databases.user_collection import UserRepository
 from backend.databases.supplier_collection import SupplierRepository
@@ -11,13 +13,13 @@ from backend.data.supplier_data import SUPPLIERS_DATA
 from backend.data.product_data import PRODUCTS_DATA
 
 
-def seed_users(user_repo: UserRepository, users_data: list):
+async def seed_users(user_repo: UserRepository, users_data: list):
     """Seed dữ liệu users vào MongoDB"""
     print("🔄 Seeding users...")
     count = 0
     for user_data in users_data:
         try:
-            user_repo.insert_user(user_data)
+            await user_repo.insert_user(user_data)
             count += 1
             print(f"  ✓ User '{user_data['username']}' created")
         except ValueError as e:
@@ -28,13 +30,13 @@ def seed_users(user_repo: UserRepository, users_data: list):
     return count
 
 
-def seed_suppliers(supplier_repo: SupplierRepository, suppliers_data: list):
+async def seed_suppliers(supplier_repo: SupplierRepository, suppliers_data: list):
     """Seed dữ liệu suppliers vào MongoDB"""
     print("🔄 Seeding suppliers...")
     count = 0
     for supplier_data in suppliers_data:
         try:
-            supplier_repo.insert_supplier(supplier_data)
+            await supplier_repo.insert_supplier(supplier_data)
             count += 1
             print(f"  ✓ Supplier '{supplier_data['code']}' created")
         except ValueError as e:
@@ -45,19 +47,19 @@ def seed_suppliers(supplier_repo: SupplierRepository, suppliers_data: list):
     return count
 
 
-def seed_products(product_repo: ProductRepository, products_data: list):
+async def seed_products(product_repo: ProductRepository, products_data: list):
     """Seed dữ liệu products vào MongoDB"""
     print("🔄 Seeding products...")
     count = 0
     for product_data in products_data:
         try:
-            product_repo.insert_product(product_data)
+            await product_repo.insert_product(product_data)
             count += 1
             print(f"  ✓ Product '{product_data['code']}' created")
         except ValueError as e:
             # Nếu đã tồn tại thì cập nhật lại dữ liệu (bao gồm image_url)
             try:
-                product_repo.update_product(product_data.get("code"), product_data)
+                await product_repo.update_product(product_data.get("code"), product_data)
                 print(f"  ↻ Product '{product_data['code']}' updated")
             except Exception as update_err:
                 print(f"  ⚠️  {str(e)}")
@@ -71,7 +73,7 @@ def seed_products(product_repo: ProductRepository, products_data: list):
 
 
 
-def seed_all():
+async def seed_all():
     """Seed toàn bộ dữ liệu vào MongoDB"""
     print("=" * 60)
     print("🚀 STARTING DATABASE SEEDING")
@@ -85,11 +87,15 @@ def seed_all():
         user_repo = UserRepository(db)
         supplier_repo = SupplierRepository(db)
         product_repo = ProductRepository(db)
+        for repo in (user_repo, supplier_repo, product_repo):
+            await repo._ensure_indexes()
 
         # Seed dữ liệu theo thứ tự
-        total_users = seed_users(user_repo, USERS_DATA)
-        total_suppliers = seed_suppliers(supplier_repo, SUPPLIERS_DATA)
-        total_products = seed_products(product_repo, PRODUCTS_DATA)
+        total_users = await seed_users(user_repo, USERS_DATA)
+        total_suppliers = await seed_suppliers(supplier_repo, SUPPLIERS_DATA)
+        total_products = await seed_products(product_repo, PRODUCTS_DATA)
+        # Bổ sung dữ liệu tìm kiếm cho sản phẩm tạo từ trước
+        await product_repo.rebuild_search_index()
 
         # Tóm tắt kết quả
         print("=" * 60)
@@ -108,4 +114,4 @@ def seed_all():
 
 
 if __name__ == "__main__":
-    seed_all()
+    asyncio.run(seed_all())